@@ -16,47 +16,138 @@ import sys
 import re
 import optparse
 import os
-import glob
+import collections
+
+# optional: RE2 (pip install google-re2) is used to pick out the lines that need coloring
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+##########################
+# Regular expressions used on every line of the build output, compiled once
+# - build logs are ASCII, so \w \d \s needn't consult the unicode tables
+#   (python 2 str patterns are ASCII-only already and have no re.ASCII)
+##########################
+_RE_FLAGS = getattr(re, "ASCII", 0)
+
+_WARN_RE     = re.compile(r"([Ww]arning):", _RE_FLAGS)
+_ALL_RE      = re.compile(r"(.*)", _RE_FLAGS)
+_TRIM_RE     = re.compile(r"\s+-([DILl]|Wl,)\S+", _RE_FLAGS)
+_ERR_LINE_RE = re.compile(r"^([^:]+):(\d+): error:", _RE_FLAGS)
+_INC_RE      = re.compile(r"^In file included from ([^:]+.cc):(\d+):", _RE_FLAGS)
+_FROM_RE     = re.compile(r"^\s+from ([^:]+.cc):(\d+):", _RE_FLAGS)
+_H_SUFFIX_RE = re.compile(r"\.h$", _RE_FLAGS)
+
+# suffixes of the files g++ produces from a .cc
+_OBJ_SUFFIXES = (".o", ".os", ".so")
+
+# Everything the colorizer highlights, as one alternation so each line is scanned once.
+# The named group holds the text to be colored; 'filename' and 'fileline' come together.
+# - a filename starts a word (\b), so \w+ isn't retried from every character inside a word
+_COLORIZER_REGEX = (r"(?P<warning>[Ww]arning):"
+                    r"|(?P<error>[Ee]rror):"
+                    r"|\b(?P<filename>\w+\.(?:cc|h|i|hpp)):(?P<fileline>\d+)[,:]"
+                    r"|:(?P<lineno>\d+)[,:]"
+                    r"|(?P<passed>passed)"
+                    r"|(?P<failed>failed)"
+                    r"|(?:\.\.\. ?|\(cached\) ?)(?P<yes>yes)\n"
+                    r"|(?:\.\.\. ?|\(cached\) ?)(?P<no>no)\n")
+_COLORIZER = re.compile(_COLORIZER_REGEX, _RE_FLAGS)
+
+# Most lines have nothing to color, and re backtracks through the alternation at every
+# character to find that out.  RE2's linear-time scan answers it several times faster, but its
+# python sub() is slow, so it only decides whether _COLORIZER needs to run at all.
+# (RE2's \w \d \s are always ASCII)
+_COLORIZER_SCAN = re2.compile(_COLORIZER_REGEX).search if re2 else None
 
 
+##########################
+# The terminal codes to set color/style of text, built once
+##########################
+_ANSI = {"red": "\033[31m", "green": "\033[32m", "yellow": "\033[33m", "blue": "\033[34m",
+         "magenta": "\033[35m", "cyan": "\033[36m", "bold": "\033[1m", "reset": "\033[0m"}
+
 ##########################
 # A function which prints the terminal code to set color/style of text
 ##########################
 def color(col):
-    c = {"red":31, "green":32, "yellow":33, "blue":34, "magenta":35, "cyan":36, "reset":0}
-    s = {"bold":1}
+    return _ANSI.get(col, _ANSI["reset"])  # default to 'reset'
 
-    base = "\033["
-    out = 0 # default to 'reset'
-    if col in c:
-        out = c[col]
-    elif col in s:
-        out = s[col]
-    return base + str(out) + "m"
+# the color/style prefix used for each named group in _COLORIZER
+COLOR_TABLE = {
+    "warning":  _ANSI["yellow"],
+    "error":    _ANSI["red"] + _ANSI["bold"],
+    "filename": _ANSI["cyan"],
+    "fileline": _ANSI["magenta"],
+    "lineno":   _ANSI["magenta"],
+    "passed":   _ANSI["green"],
+    "failed":   _ANSI["red"] + _ANSI["bold"],
+    "yes":      _ANSI["green"],
+    "no":       _ANSI["red"] + _ANSI["bold"],
+    }
 
 ############################
-# A function which searches for a pattern and colors/styles a captured portion of it.
+# A function which searches for a compiled pattern and colors/styles a captured portion of it.
 # ##########################
-def regexColorReplace(regex, clrs, line):
-    m = re.search(regex, line)
+def regexColorReplace(pattern, clrs, line):
+    m = pattern.search(line)
     out = line
-    found = False
     if (m):
-        found = True
-        pattern = m.group(1)
-        colorPattern = ""
+        captured = m.group(1)
         # note clrs is a list, this way colors and styles can be included together (ie. ["red", "bold"]
-        for clr in clrs:
-            colorPattern += color(clr)
-        colorPattern += pattern + color("reset")
-        # if it's just digits, it must be line numbers
-        # it'll match all digits, so we'll put the colon (g++ output) in the match expression
-        if re.search("^\d+$", pattern):
-            out = re.sub(":"+pattern, ":"+colorPattern, line)
-        else:
-            out = re.sub(pattern, colorPattern, line)
+        colorPattern = "".join([_ANSI[clr] for clr in clrs]) + captured + _ANSI["reset"]
+        # line numbers are colored by colorizeMatch(), so the captured text is never just
+        # digits here and it can be replaced as a plain string
+        out = line.replace(captured, colorPattern)
             
-    return out, found
+    return out
+
+
+############################
+# A function which lists a directory, treating a missing one as empty (as glob would)
+# ##########################
+def listDirectory(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+############################
+# A function which checks whether g++ has produced an object file (.o, .os, .so) from srcFile
+# - dirCache maps a directory to the set of names in it, so a directory is only read once
+# ##########################
+def hasObjectFile(srcFile, dirCache):
+    srcDir, srcName = os.path.split(os.path.splitext(srcFile)[0])
+    srcDir = srcDir or "."
+    names = dirCache.get(srcDir)
+    if names is None:
+        names = dirCache[srcDir] = set(listDirectory(srcDir))
+    for suffix in _OBJ_SUFFIXES:
+        if srcName + suffix in names:
+            return True
+    return False
+
+
+############################
+# The re.sub() callback for _COLORIZER: wrap the captured group(s) of a match in color.
+# ##########################
+def colorizeMatch(m):
+    text = m.group()
+    offset = m.start()
+    names = [m.lastgroup]
+    if m.lastgroup == "fileline":
+        names.insert(0, "filename")
+
+    out = ""
+    pos = 0
+    for name in names:
+        start, end = m.span(name)
+        out += text[pos:start - offset] + COLOR_TABLE[name] + m.group(name) + _ANSI["reset"]
+        pos = end - offset
+    return out + text[pos:]
 
 
 #############################################################
@@ -64,11 +155,16 @@ def regexColorReplace(regex, clrs, line):
 # Main body of code
 #
 #############################################################
-def main(filedesc, log, retryscript):
+def main(filedesc, log, retryscript, unbuffered=False):
 
+    # every input line goes to noI.log, so give the logs a large buffer and
+    # look up their write() methods only once
+    logBufferSize = 1 << 16
+    writeLog = writeWarn = None
     if log:
-        fp_log = open("noI.log", 'w')
-        fp_warn = open("noI.warn", 'w')
+        fp_log = open("noI.log", 'w', logBufferSize)
+        fp_warn = open("noI.warn", 'w', logBufferSize)
+        writeLog, writeWarn = fp_log.write, fp_warn.write
         
     ####################################
     # loop over stdin lines
@@ -86,64 +182,74 @@ def main(filedesc, log, retryscript):
     nWarning = 0
     compile_lines = {}  # store the compile statement by path of the .cc file
     srcFileLookup = {}  # need to lookup the .cc file to build if the error is in a .h file
-    prev_line = ""
-    s = ""
+    script = []  # the lines of the retry script, joined when it's written
     srcFileList = []
-    already_compiling = {}  # avoid putting the same build line in the rebuild script multiple times
-    raw_lines = []
-    iLine = 0
-    while(True):
-        line = filedesc.readline()
+    already_compiling = set()  # avoid putting the same build line in the rebuild script multiple times
+    dirCache = {}  # directory listings used to see which sources have been built
+    raw_lines = collections.deque(maxlen=8)  # only the last few lines are needed to find a .h file's .cc
+
+    # the methods called on every line, looked up once rather than per line
+    appendRawLine = raw_lines.append
+    trimOptions = _TRIM_RE.sub
+    searchWarning = _WARN_RE.search
+    matchErrorLine = _ERR_LINE_RE.match
+    colorize = _COLORIZER.sub
+    scanColor = _COLORIZER_SCAN
+    write = sys.stdout.write
+    
+    for line in filedesc:
         
         raw_line = line
-        if log:
-            fp_log.write(raw_line)
+        if writeLog:
+            writeLog(raw_line)
 
-        raw_lines.append(raw_line)
-        iLine += 1
+        appendRawLine(raw_line)
         
-        if not line:
-            break
-
         # trim the g++ options (-I -L etc.)
-        line = re.sub("\s+-([DILl]|Wl,)\S+", "", line)
+        # ... every option starts with '-', so most lines (compiler messages) can skip the regex
+        if "-" in line:
+            line = trimOptions("", line)
         
         # stash the line if it's a compile statement (starts with 'g++')
         # POSSIBLE BUG if another compiler is used.
-        if re.search("^g\+\+", raw_line):
+        if raw_line.startswith("g++"):
             srcFile = (line.split())[-1]
             srcFileList.append(srcFile)
-            compile_lines[srcFile] = raw_line.strip()
+            compile_lines[srcFile] = raw_line.rstrip()  # starts with "g++", only the end needs stripping
             srcFileLookup[srcFile] = srcFile
+            # a new build in this directory, so its cached listing may be out of date
+            dirCache.pop(os.path.dirname(srcFile) or ".", None)
             
         ### warnings ###
-        line, foundwarn = regexColorReplace("([Ww]arning):", ["yellow"], line)
+        foundwarn = searchWarning(line)
         
         ### errors ###
 
         # write a script to re-execute the compile statement which failed
         # ... no sense redoing the whole configure/build
-        m = re.search("^([^:]+):(\d+): error:", line)
+        m = matchErrorLine(line)
         if m:
             errFile = m.groups()[0]
             
             # if a .h file, need to get the corresponding .cc file 
-            if re.search("\.h$", errFile):
+            if _H_SUFFIX_RE.search(errFile):
 
                 ##########
                 # need to check two possibilities
 
                 
                 # - .h file included directly in a .cc (it'll be listed on the previous line)
-                mm = re.search("^In file included from ([^:]+.cc):(\d+):", raw_lines[iLine-2])
+                mm = None
+                if len(raw_lines) >= 2:
+                    mm = _INC_RE.match(raw_lines[-2])
                 
                 # - .h file included from a chain of .h
                 # (.cc which includes the first in the chain will be on a recent line ... different regex)
                 mm2 = False
                 maxLines = 2
                 iL = 0
-                while (not mm2 and iL < maxLines):
-                    mm2 = re.search("^\s+from ([^:]+.cc):(\d+):", raw_lines[iLine-2-iL])
+                while (not mm2 and iL < maxLines and len(raw_lines) >= 2 + iL):
+                    mm2 = _FROM_RE.match(raw_lines[-2-iL])
                     iL += 1
 
                     
@@ -157,90 +263,67 @@ def main(filedesc, log, retryscript):
                 # last ditch effort ... check the last few g++ statements and see if the outputs are there
                 else:
                     maxCheck = 8
-                    iCheck = 0
-                    while (iCheck < maxCheck):
-                        if len(srcFileList) < iCheck:
-                            break
-                        
-                        srcFile = srcFileList[-iCheck]
-                        srcPattern = re.sub(".cc$", "", srcFile)
-                        possibleObjFiles = glob.glob(srcPattern+".*") #{o,os,so}")
-                        possibleObjFiles = filter(lambda x: re.search(".(o|os|so)$", x), possibleObjFiles)
-                            
+                    for srcFile in reversed(srcFileList[-maxCheck:]):
                         #if it built
-                        if len(possibleObjFiles) == 0:
+                        if not hasObjectFile(srcFile, dirCache):
                             srcFileLookup[errFile] = srcFile
                             break
-                        
-                        iCheck += 1
-
-            if not srcFileLookup.has_key(errFile):
-                mesg, found = regexColorReplace("(.*)", ["red"],
-                                                "Can't associate "+errFile+
-                                                " with a .cc file build.  No entry in build script.")
-                print mesg
+
+            srcFile = srcFileLookup.get(errFile)
+            if srcFile is None:
+                mesg = regexColorReplace(_ALL_RE, ["red"],
+                                         "Can't associate "+errFile+
+                                         " with a .cc file build.  No entry in build script.")
+                print(mesg)
                 
             else:
-                srcFile = srcFileLookup[errFile]
-                if not already_compiling.has_key(srcFile):
+                if srcFile not in already_compiling:
                     compile_line = compile_lines[srcFile]
-                    already_compiling[srcFile] = 1
+                    already_compiling.add(srcFile)
 
                     # write the #! line on the first pass
-                    if len(s) == 0:
-                        s += "#!/usr/bin/env bash\n"
+                    if not script:
+                        script.append("#!/usr/bin/env bash\n")
 
                     # the rebuild script should echo what it's doing and do it.
-                    s += "echo \"" + compile_line + "\"\n"
-                    s += compile_line + "\n"  #" 2>&1 | " + sys.argv[0] + "\n"
+                    script.append("echo \"" + compile_line + "\"\n")
+                    script.append(compile_line + "\n")  #" 2>&1 | " + sys.argv[0] + "\n"
 
 
                     
         # highlight the text after searching for 'error' in the line
         # (highlighting inserts extra characters)
-        line, found = regexColorReplace("([Ee]rror):", ["red", "bold"], line)
-        
-        ### filenames ###
-        line, found = regexColorReplace(r'\/?(\w+\.(?:cc|h|i|hpp)):\d+[,:]', ["cyan"], line)
-        
-        ### file linenumbers ###
-        # don't try to match the filename too, it's now wrapped in \esc for cyan
-        line, found = regexColorReplace(':(\d+)[,:]', ["magenta"], line)
-
-        ### tests ###
-        line, found = regexColorReplace("(passed)", ["green"], line)
-        line, found = regexColorReplace("(failed)", ["red", "bold"], line)
-
-        ### yes/no ###
-        line, found = regexColorReplace("(?:\.\.\. ?|\(cached\) ?)(yes)\n", ["green"], line)
-        line, found = regexColorReplace("(?:\.\.\. ?|\(cached\) ?)(no)\n", ["red", "bold"], line)
+        # warnings, errors, filenames and their linenumbers, tests, and yes/no are all
+        # colored in a single pass
+        if scanColor is None or scanColor(line):
+            line = colorize(colorizeMatch, line)
         
         # add a line number to the output and make it bold
-        line = "==" +str(i)+ "== " + line
+        line = "==%d== %s" % (i, line)
 
         
         # log the warning here, so we get the color markup and line number
         if foundwarn:
             nWarning += 1
-            if log:
-                fp_warn.write(line)
+            if writeWarn:
+                writeWarn(line)
 
-                
-        prev_line = raw_line
-        
-        sys.stdout.write(line)
-        sys.stdout.flush()
+        write(line)
+        # let stdout buffer the output unless we've been asked to show each line as it arrives
+        if unbuffered:
+            sys.stdout.flush()
 
         i += 1
 
-    warnyellow = color("yellow") + "warnings" + color("reset")
-    print "There were %d %s (run with -l and see noI.warn)." % (nWarning, warnyellow)
+    warnyellow = _ANSI["yellow"] + "warnings" + _ANSI["reset"]
+    print("There were %d %s (run with -l and see noI.warn)." % (nWarning, warnyellow))
+    sys.stdout.flush()
     
-    if len(s) > 0:
+    if script:
         fp = open(retryscript, 'w')
-        fp.write(s)
+        fp.write("".join(script))
         fp.close()
-        os.chmod(retryscript, 0744)
+        os.chmod(retryscript, 0o744)
         
     if log:
         fp_log.close()
@@ -260,10 +343,12 @@ if __name__ == '__main__':
                       help="Log all messages in noI.log? (default=%default)")
     parser.add_option("-r", "--retryscript", default="b",
                       help="Name of script to retry the most recent compile statment. (default=%default)")
+    parser.add_option("-u", "--unbuffered", action="store_true", default=False,
+                      help="Flush the output after every line? (default=%default)")
     opts, args = parser.parse_args()
 
     if len(args) > 0:
         parser.print_help()
         sys.exit(1)
     
-    main(sys.stdin, opts.log, opts.retryscript)
+    main(sys.stdin, opts.log, opts.retryscript, opts.unbuffered)
@@ -64,14 +64,17 @@
 #
 # functions:
 #    flagLines(lines):
-#    parseLines(lines, filetype):
+#    parseLines(lines, filetype, text = None):
 #    getPrimitives():
 #    getPrimitivesOr():
 #    getVariableNames(line, stypes = getPrimitivesOr()):
+#    findVariableNames(line, stypes):
 #    getFunctionNames(line):
 #    getTemplateNames(line):
-#    getDefinitionLength(lines, iLine):
+#    setDefinitionLengths(lines):
 #    initializeTestList(filetype, infile):
+#    checkFile(infile):
+#    checkFileCached(fileAndCacheDir):
 # 
 # Todo:
 # -- set the priorities to correspond to lsst 'severity'
@@ -80,7 +83,7 @@
 
 
 """
-%prog [options] infile
+%prog [options] infile [infile ...]
 """
 
 import sys
@@ -88,27 +91,242 @@ import re
 import optparse
 import os
 import datetime
+import multiprocessing
 import copy
+import bisect
+import operator
+import hashlib
+import pickle
+import cStringIO
+import string
 
 
 
+
+###################################################################
+# Regular expressions used by the tests, compiled once
+# - the tests run them on every line (and every name on a line),
+#   so they shouldn't be looked up in re's cache on each call
+# - those anchored with '^' are used with match(), so they aren't tried at every position
+###################################################################
+_RE_TYPEDEF            = re.compile(r"typedef.*\s+([a-z]\w*);\s*$")
+_RE_ITERATOR           = re.compile(r"iterator;\s*$")
+_RE_PTR_REF            = re.compile(r"\s*[\*\&]\s*")
+_RE_TWO_UPPER          = re.compile(r"[A-Z]{2}")
+_RE_SPECIAL_CHARS      = re.compile(r"(?P<t>\t)|(?P<r>\r)|(?P<f>\f)")
+_RE_INCLUDE_QUOTE      = re.compile(r'^\#include\s+"\w+\.h(pp)?"\s*$')
+_RE_INCLUDE_ANGLE      = re.compile(r"^\#include\s*\<\w+(\.h|\.hpp)?\>\s*$")
+_RE_DECLARATION_END    = re.compile(r";\s*$")
+
+# 4-1, 4-4a, 4-9
+_RE_EMACS_HEADER       = re.compile(r"^//\s+-\*- (?:LSST-C|lsst-c)\+\+ -\*-")
+_RE_TEMPLATE           = re.compile(r"^\s*template")
+_RE_IF_NOT_DEFINED     = re.compile(r"^\#if !defined\((LSST_[A-Z_]+_H)\)\s*$")
+_RE_IFNDEF             = re.compile(r"^\#ifndef (LSST_[A-Z_]+_H)\s*$")
+
+# 5-8, 5-14
+_RE_CONST_STATIC       = re.compile(r"(const|static)")
+_RE_FOR_CONTROL        = re.compile(r"^\s*for\s*\(([^;]+);([^;]+);([^;]+)\)")
+
+# 5-24 (argument declarations: on one line, or the first, a middle, or the last of several)
+# - each has at most one way to match a line with the parentheses it needs, so their cost stays
+#   linear in the line; for ONE_LINE, the arguments are checked for white space afterwards
+#   (with it in the regex, '[^\)]+\s[^\)]+' tried every split of a line which then failed)
+_RE_DECL_ONE_LINE      = re.compile(r"^[^\(]+\(([^\)]+)\)\s*[\{;]?\s*$")
+_RE_DECL_FIRST         = re.compile(r"^[^\(]+\(([^\)]+)$")
+_RE_DECL_MIDDLE        = re.compile(r"^\s*([^\(\)]+)$")
+_RE_DECL_LAST          = re.compile(r"^\s*([^\(\)]+)\s*\)(?:\s*const)?\s*[\{;:]?\s*$")
+_RE_DECL_END           = re.compile(r"\)(?:\s*const)?\s*[\{;:]")
+_RE_PUNCT_SPACE        = re.compile(r"\s*([\,\=\+\-\*\/;\(\)])\s*")
+_RE_WHITESPACE         = re.compile(r"\s")
+
+# 5-27, 5-28, 5-29
+_RE_ONE_ARG            = re.compile(r"^\s*([^\(]+)\s*\([^\),]+\s[^\),]+\)")
+_RE_NAME_SPECIAL       = re.compile(r"([\&\[\]])")
+_RE_EXPLICIT           = re.compile(r"^\s*explicit")
+_RE_DESTRUCTOR         = re.compile(r"^\s*((?:\s*virtual\s*)\~|\w+::\~)")
+_RE_TILDE              = re.compile(r"^\s*\~")
+_RE_BASE_CLASS         = re.compile(r"Base$")
+_RE_VIRTUAL            = re.compile(r"^\s*virtual")
+
+# 5-39, 5-40, 5-41
+_RE_CHAR_STAR          = re.compile(r"char\s*(const\s*)?\*")
+_RE_ARRAY_SIZE         = re.compile(r"\[[^\]]+\]")
+_RE_USING              = re.compile(r"^\s*using")
+_RE_USING_STD          = re.compile(r"\s*std\s*;\s*$")
+
+# 6-2, 6-4, 6-5, 6-9
+_RE_OPEN_PAREN         = re.compile(r"\([^\)]+$")
+_RE_CLOSE_PAREN        = re.compile(r"[^\(]+\)")
+_RE_OPEN_BRACKET       = re.compile(r"[\(\[]")
+_RE_LEADING_OPEN_BRACE = re.compile(r"^\s*\{")
+_RE_NON_BLANK          = re.compile(r"[^\s]+")
+_RE_CLASS_ACCESS       = re.compile(r"^.+(class|private|protected|public):")
+_RE_OPEN_BRACE_END     = re.compile(r"\{\s*$")
+
+# 6-16a (operators, and the places +/-/= are allowed without spaces)
+_RE_EQUAL              = re.compile(r"(.?[\w\d]\=[^\=]|.?[^\!\&\|\+\-\*\/\=]\=[\w\d])")
+_RE_PLUS               = re.compile(r"(.?[\w\d]\+[^\+\=]|.?[^\+]\+[\w\d])")
+_RE_MINUS              = re.compile(r"(.?[\w\d]\-[^\-\=]|.?[^\-]\-[\w\d])")
+_RE_DEFAULT_SAME_LINE  = re.compile(r"\([^\)]*([^=]=[^=])+[^\(]*\)")
+_RE_DEFAULT_DIFF_LINE  = re.compile(r"[\d\w]=[\d\w]+(?:\<\w+\>)?(?:\(.*\))?,")
+_RE_OPERATOR_EQUAL     = re.compile(r"operator=\(")
+_RE_SCI_PLUS           = re.compile(r"[\d\.][eE]\+\d")
+_RE_POSITIVE           = re.compile(r"[\:\=\+\-\*\/\(\,\<\>\?]\s*\+")
+_RE_OPERATOR_PLUS      = re.compile(r"operator\+\(")
+_RE_RETURN_PLUS        = re.compile(r"return\s+\+")
+_RE_EOL_PLUS           = re.compile(r"\+$")
+_RE_BOL_PLUS           = re.compile(r"^\s*\+")
+_RE_SCI_MINUS          = re.compile(r"[\d\.][eE]\-\d")
+_RE_NEGATIVE           = re.compile(r"[\:\=\+\-\*\/\(\,\<\>\?]\s*\-")
+_RE_RETURN_MINUS       = re.compile(r"return\s+\-")
+_RE_OPERATOR_MINUS     = re.compile(r"operator\-\(")
+_RE_EOL_MINUS          = re.compile(r"\-$")
+_RE_BOL_MINUS          = re.compile(r"^\s*\-")
+_RE_POINTER_DEREF      = re.compile(r"\->")
+_RE_COMPOUND_ASSIGN    = re.compile(r"([^\s][\!\&\|\+\-\*\/]\=|[\!\&\|\+\-\*\/]\=[^\s])")
+_RE_OPERATOR_COMPOUND  = re.compile(r"operator[\&\|\*\+\-\/]?=\(")
+
+# 6-16b, 6-21b
+_RE_COMMA_NO_SPACE     = re.compile(r",[^\s]")
+_RE_COMMA_EOL          = re.compile(r",\s*$")
+_RE_RESERVED_NO_SPACE  = re.compile(r"^\s*(for|if|while|else|switch)[^\s\w]")
+_RE_SEMI_NO_SPACE      = re.compile(r";[^\s]")
+_RE_SEMI_EOL           = re.compile(r";$")
+_RE_NESTED_NAMESPACE   = re.compile(r"namespace.*namespace")
+_RE_INDENTED_NAMESPACE = re.compile(r"^\s+namespace")
+
+# the start of an if/for/while, shared by the tests of conditionals (see Test.prefilter)
+_RE_CONDITION_HEAD     = re.compile(r"^\s*(?:if|for|while)\s*\(", re.M)
+
+# The features of a line that several tests look for, found in one scan of the line (see flagLines())
+# - all but the braces and 'inline' must start the line, so they can't overlap one another
+# - a '};' closing a class is also a close brace
+_RE_FEATURES = re.compile(r"(?P<switch>^\s*switch)|(?P<brk>^\s*break;)|(?P<cont>^\s*continue;)"
+                          r"|(?P<forHead>^\s*for\s*\()|(?P<include>^\#include)|(?P<classClose>^\s*\};)"
+                          r"|(?P<open>\{)|(?P<close>\})|(?P<inline>inline)")
+_FEATURE_ATTRIBUTES = {
+    "switch":     ["isSwitch"],
+    "brk":        ["isBreak"],
+    "cont":       ["isContinue"],
+    "forHead":    ["isForHead"],
+    "include":    ["isInclude"],
+    "classClose": ["isClassClose", "hasCloseBrace"],
+    "open":       ["hasOpenBrace"],
+    "close":      ["hasCloseBrace"],
+    "inline":     ["hasInline"],
+    }
+
+
+###################################################################
+# Regular expressions used by flagLines() and parseLines() on every line, compiled once
+###################################################################
+
+# what starts the line, if it starts a class/struct block, a public/protected/private section,
+# or closes a block with '};' (only one of them can), found with one match() and the group name
+_RE_BLOCK_TAG = re.compile(r"\s*(?:class\s+(?P<className>\w+)\s*:?\s+|struct\s+(?P<structName>\w+)\s*:?\s+"
+                           r"|(?P<public>public:)|(?P<protected>protected:)|(?P<private>private:))"
+                           r"|(?P<blockEnd>\};)")
+
+_RE_C_COMMENT          = re.compile(r"\/\*.+?\*\/")         # /* */ on one line
+_RE_C_COMMENT_START    = re.compile(r"\/\*.*$")             # /* which continues
+_RE_C_COMMENT_END      = re.compile(r"^.*\*\/")             # ... and its */
+_RE_CPP_COMMENT        = re.compile(r"\/\/+.*$")            # C // style comments
+_RE_STRING             = re.compile(r'"[^"]*"')             # normal strings
+_RE_PY_DOC             = re.compile(r'""".*?"""')           # """ """ on one line
+_RE_PY_DOC_START       = re.compile(r'""".*$')              # """ which continues
+_RE_PY_DOC_END         = re.compile(r'^.*"""')              # ... and its """
+_RE_ESCAPED_QUOTE      = re.compile(r'\\"')               # escaped \" characters
+_RE_PY_COMMENT         = re.compile(r"#.*$")                # python comments
+_RE_SUPPRESS           = re.compile(r'parasoft-suppress\s+([^"]+)')
+_RE_LETTER             = re.compile(r"[A-Za-z]")
+
+# the types of file which can be checked (by their suffix)
+_FILETYPES             = frozenset(["cc", "c", "h", "py"])
+
+###################################################################
+# Function compileRegex
+# - re.compile(), but each (regex, flags) is compiled only once, and everything using it
+#   shares the one object (the tests are made again for every file, and many regexes are
+#   built from the names found on each line)
+# - re's own cache is small (100 in python 2) and is emptied when it fills up, which the
+#   regexes built from names quickly do ... taking the fixed ones with them
+###################################################################
+_compiledRegexes = {}
+_MAX_COMPILED_REGEXES = 10000   # forget them all beyond this, as re does, so a long run can't grow forever
+
+def compileRegex(regex, flags = 0):
+    key = (regex, flags)
+    compiled = _compiledRegexes.get(key)
+    if compiled is None:
+        if len(_compiledRegexes) >= _MAX_COMPILED_REGEXES:
+            _compiledRegexes.clear()
+        compiled = _compiledRegexes[key] = re.compile(regex, flags)
+    return compiled
+
+
+###################################################################
+# Regular expressions built from a variable name, compiled once per name
+# - the same names turn up on line after line, so the compiled regexes are
+#   kept rather than built (and looked up in re's cache) every time
+# - the names are escaped, so '[]' in an array declaration is taken literally
+###################################################################
+_constAfterTypeRegexes = {}
+_argumentRegexes = {}
+_MAX_NAME_REGEXES = 10000   # forget them all beyond this (for each), so a long run can't grow forever
+
+# 5-10: 'const' before the type of the variable
+def getConstAfterTypeRegex(variable, stypes):
+    key = (variable, stypes)
+    regex = _constAfterTypeRegexes.get(key)
+    if regex is None:
+        if len(_constAfterTypeRegexes) >= _MAX_NAME_REGEXES:
+            _constAfterTypeRegexes.clear()
+        regex = re.compile(r"const\s+(" + stypes + r")\s+" + re.escape(variable))
+        _constAfterTypeRegexes[key] = regex
+    return regex
+
+# 3-10: the variable is in an argument list (in parens, with a leading paren,
+#       with a trailing paren, or comma separated)
+def getArgumentRegexes(variable):
+    regexes = _argumentRegexes.get(variable)
+    if regexes is None:
+        if len(_argumentRegexes) >= _MAX_NAME_REGEXES:
+            _argumentRegexes.clear()
+        name = re.escape(variable)
+        regexes = (re.compile(r"\([^\)]*" + name + r"[^\)]*\)$"),
+                   re.compile(r"\([^\)]*" + name + r"[^\)]*$"),
+                   re.compile(r"^[^\)]*" + name + r"[^\)]*\)"),
+                   re.compile(name + r".*,\s*$"))
+        _argumentRegexes[variable] = regexes
+    return regexes
+
+
 ###################################################################
 # class Test
 # - The Base Class for each test
 # - simple regex tests can be created with the constructor alone.
 # - more complicated tests overload apply()
 # - the getXX() methods need never be overloaded.
+# - apply() is only called if the filetype is in the typeList (see initializeTestList())
 #
 ###################################################################
 class Test():
 
+    # the regex can be given compiled (one of the module's _RE_ regexes), and that one is used
     def __init__(self, severity, regex, id, comment, filetype, typeList = ["c", "cc", "h", "py"]):
+        self._re = None     # compiled once, searched on every line
+        if hasattr(regex, "pattern"):
+            self._re, regex = regex, regex.pattern
+        elif regex:
+            self._re = compileRegex(regex)
         self.severity = severity
         self.regex = regex
-        self.id = id
+        self.id = intern(id)
         self.comment = comment
-        self.filetype = filetype
-        self.typeList = typeList
+        self.filetype = intern(filetype)
+        self.typeList = frozenset(typeList)
+        self._reText = compileRegex(regex, re.M) if regex else None  # for all lines at once (see apply())
 
     def getSeverity(self):  return self.severity
     def getRegex(self):     return self.regex
@@ -116,13 +334,36 @@ class Test():
     def getComment(self):   return self.comment
     def getFiletype(self):  return self.filetype  # suffix of the input file
     def getTypeList(self):  return self.typeList  # suffixes to apply this test to
+
+    # Something any line the regex matches must contain, if the regex doesn't start with it
+    # (re finds a leading literal itself, but not one after '^' or '\s*', so it tries every position):
+    # - a string, or
+    # - a regex (with re.M) shared by several tests, so it's only searched for once (see findLines())
+    prefilter = None
+
+    # Strings which must all be in the file (its stripped lines) for this test to find anything.
+    # Whether they are is a few plain searches of the text, so it's checked before the test is run.
+    literals = ()
+
+    # Whether the test can't find anything in the file (one of its literals isn't there),
+    # so it needn't be applied
+    def isRuledOut(self, lines):
+        if self.literals:
+            text = getStrippedText(lines)[0]
+            for literal in self.literals:
+                if literal not in text:
+                    return True
+        return False
     
+    # Rather than searching each line in turn, search the whole file's text for the regex
+    # (or the prefilter) and only look at the lines where that finds something (see findLines()).
     def apply(self, lines):
         vList = []
-        if ( self.getFiletype() in self.getTypeList() ):
-            for line in lines:
-                if ( re.search(self.regex, line.stripped) ):
-                    vList.append( Violation(self, line) )
+        searchLine = self._re.search
+        for iLine in findLines(lines, self.prefilter or self._reText):
+            line = lines[iLine]
+            if ( searchLine(line.stripped) ):
+                vList.append( Violation(self, line) )
         return vList
 
     
@@ -136,14 +377,16 @@ class TestUserType(Test):
 
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                isTypedef = re.search("typedef.*\s+([a-z]\w*);\s*$", line.stripped)
-                # we'll let the typedef'd iterators slide through
-                isIterator = re.search("iterator;\s*$", line.stripped)
-                if isTypedef and not isIterator:
-                    vList.append(Violation(self, line))
-                            
+        searchTypedef, searchIterator = _RE_TYPEDEF.search, _RE_ITERATOR.search
+        for iLine in findLines(lines, "typedef"):
+            line = lines[iLine]
+            stripped = line.stripped
+            isTypedef = searchTypedef(stripped)
+            # we'll let the typedef'd iterators slide through
+            isIterator = searchIterator(stripped)
+            if isTypedef and not isIterator:
+                vList.append(Violation(self, line))
+                        
         return vList
 
         
@@ -158,29 +401,32 @@ class TestVariableName(Test):
         vList = []
         for line in lines:
             iLine = line
+            isHidden = line.inPrivate or line.inProtected
 
-            if (self.getFiletype() in self.getTypeList()):
-                for variable in line.variableNames:
+            for variable in line.variableNames:
 
-                    #strip any pointer/ref characters
-                    variable = re.sub("\s*[\*\&]\s*", "", variable)
+                #strip any pointer/ref characters
+                # (names seldom have any, and looking for them is far cheaper than the substitution)
+                if "*" in variable or "&" in variable:
+                    variable = _RE_PTR_REF.sub("", variable)
+                
+                # check for upper case start
+                # (the names are checked with string methods, not regexes)
+                if (isHidden):
+                    if variable.startswith("_") and variable[1:2].isupper():
+                        vList.append(Violation(self, iLine, "\"" + variable + "\" starts uppercase"))
+                    # check for underscores
+                    if "_" in variable[1:]:
+                        vList.append(Violation(self, iLine, "\"" + variable +
+                                               "\" constains non-leading underscore"))
+                else:
+                    if variable[:1].isupper():
+                        vList.append(Violation(self, iLine, "\"" + variable + "\" starts uppercase"))
+                    # check for underscores
+                    if "_" in variable:
+                        vList.append(Violation(self, iLine, "\"" + variable + "\" constains underscore"))
                     
-                    # check for upper case start
-                    if (line.inPrivate or line.inProtected):
-                        if re.search("^_[A-Z]", variable):
-                            vList.append(Violation(self, iLine, "\"" + variable + "\" starts uppercase"))
-                        # check for underscores
-                        if re.search("^.+_", variable):
-                            vList.append(Violation(self, iLine, "\"" + variable +
-                                                   "\" constains non-leading underscore"))
-                    else:
-                        if re.search("^[A-Z]", variable):
-                            vList.append(Violation(self, iLine, "\"" + variable + "\" starts uppercase"))
-                        # check for underscores
-                        if re.search("_", variable):
-                            vList.append(Violation(self, iLine, "\"" + variable + "\" constains underscore"))
                         
-                            
         return vList
 
     
@@ -194,19 +440,18 @@ class TestFunctionName(Test):
     def apply(self, lines):
         vList = []
         for line in lines:
-            if (self.getFiletype() in self.getTypeList()):
-                for functionName in line.functionNames:
-                    # check of upper case start
-                    if re.search("^[A-Z]", functionName):
-                        vList.append(Violation(self, line, "Starts uppercase"))
-                    # check for underscores
-                    hasUnderscore = re.search("_", functionName)
-                    hasNonLeadingUnderscore = re.search("[^_]_", functionName)
-                    hasLeadingUnderscore = re.search("^_", functionName)
-                    if (not line.inPrivate and hasUnderscore):
-                        vList.append(Violation(self, line, "Contains underscore"))
-                    if (line.inPrivate and hasNonLeadingUnderscore):
-                        vList.append(Violation(self, line, "Contains non-leading underscore"))
+            inPrivate = line.inPrivate
+            for functionName in line.functionNames:
+                # check of upper case start
+                if functionName[:1].isupper():
+                    vList.append(Violation(self, line, "Starts uppercase"))
+                # check for underscores
+                hasUnderscore = "_" in functionName
+                hasNonLeadingUnderscore = "_" in functionName.lstrip("_")  # an '_' after something else
+                if (not inPrivate and hasUnderscore):
+                    vList.append(Violation(self, line, "Contains underscore"))
+                if (inPrivate and hasNonLeadingUnderscore):
+                    vList.append(Violation(self, line, "Contains non-leading underscore"))
                 
         return vList
     
@@ -233,14 +478,14 @@ class TestTemplateStartsUpper(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "3-7",
                       "template names must start upper case.", filetype, ["c", "cc", "h"])
+    literals = ["template<"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                templateNameList = getTemplateNames(line.stripped)
-                for name in templateNameList:
-                    if re.search("^[a-z]", name):
-                        vList.append( Violation(self, line, name) )
+        for line in lines:
+            # (flagLines() has already found them)
+            for name in line.templateNames:
+                if name[:1].islower():
+                    vList.append( Violation(self, line, name) )
         return vList
 
 
@@ -252,11 +497,11 @@ class TestAllCapAbbreviation(Test):
                       "Possible all-cap abbreviation.", filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                for variable in line.variableNames:
-                    if (re.search("[A-Z]{2}", variable)):
-                        vList.append( Violation(self, line, "\"" + variable + "\"") )
+        for line in lines:
+            for variable in line.variableNames:
+                # most names have no upper case letters at all, so don't need the regex
+                if (not variable.islower() and _RE_TWO_UPPER.search(variable)):
+                    vList.append( Violation(self, line, "\"" + variable + "\"") )
         return vList
     
 
@@ -271,33 +516,34 @@ class TestLeadingUnderscore(Test):
                       "Private variables must be prefixed with leading underscore.",
                       filetype, ["c", "cc", "h"])
     def apply(self, lines):
-        if (self.getFiletype() in self.getTypeList()):
-            vList = []
-            for line in lines:
-                if line.inPrivate:
-                    for variable in line.variableNames:
-                        # strip pointer/ref characters
-                        tmp = re.sub("\s*[\*\&]\s*", "", variable)
-                        #in parens
-                        inParens0 = re.search("\([^\)]*" + tmp + "[^\)]*\)$", line.stripped)
-                        # has leading paren
-                        inParens1 = re.search("\([^\)]*" + tmp + "[^\)]*$", line.stripped)
-                        # has trailing paren
-                        inParens2 = re.search("^[^\)]*" + tmp + "[^\)]*\)", line.stripped)
-                        # is comma separated
-                        inCommas = re.search(tmp + ".*,\s*$", line.stripped)
-                        isArg = inParens0 or inParens1 or inParens2 or inCommas
-                        if ( re.search("^[^_]", tmp) and not isArg):
-                            vList.append( Violation(self, line, variable) )
-                    for functionName in line.functionNames:
-                        # check for underscores
-                        hasLeadingUnderscore = re.search("^_", functionName)
-                        if (not hasLeadingUnderscore):
-                            vList.append(Violation(self, line, "Missing leading underscore"))
-
-            return vList
-        else:
-            return []
+        vList = []
+        for line in lines:
+            if line.inPrivate:
+                stripped = line.stripped
+                for variable in line.variableNames:
+                    # strip pointer/ref characters
+                    tmp = variable
+                    if "*" in tmp or "&" in tmp:
+                        tmp = _RE_PTR_REF.sub("", tmp)
+                    reParens0, reParens1, reParens2, reCommas = getArgumentRegexes(tmp)
+                    #in parens
+                    inParens0 = reParens0.search(stripped)
+                    # has leading paren
+                    inParens1 = reParens1.search(stripped)
+                    # has trailing paren
+                    inParens2 = reParens2.search(stripped)
+                    # is comma separated
+                    inCommas = reCommas.search(stripped)
+                    isArg = inParens0 or inParens1 or inParens2 or inCommas
+                    if ( tmp and not tmp.startswith("_") and not isArg):
+                        vList.append( Violation(self, line, variable) )
+                for functionName in line.functionNames:
+                    # check for underscores
+                    hasLeadingUnderscore = functionName.startswith("_")
+                    if (not hasLeadingUnderscore):
+                        vList.append(Violation(self, line, "Missing leading underscore"))
+
+        return vList
 
 
 ###################################################################
@@ -308,12 +554,11 @@ class TestObjectNameInMethod(Test):
                       "Object name should not appear in a method name.", filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if line.inClass:
-                    for method in line.functionNames:
-                        if ( re.search(line.className.lower(), method.lower())):
-                            vList.append( Violation(self, line) )
+        for line in lines:
+            if line.inClass:
+                for method in line.functionNames:
+                    if ( compileRegex(line.className.lower()).search(method.lower())):
+                        vList.append( Violation(self, line) )
         return vList
 
     
@@ -326,16 +571,15 @@ class TestBooleanIs(Test):
                       "Boolean variables must begin with 'is' or 'has'.", filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                variableList = getVariableNames(line.stripped, "bool")
-                for variable in variableList:
-                    if ( line.inPrivate or line.inProtected ):
-                        if ( not re.search("^(_is|_has)", variable) ):
-                            vList.append(Violation(self, line, variable))
-                    else:
-                        if ( not re.search("^(is|has)", variable) ):
-                            vList.append(Violation(self, line, variable))
+        for line in lines:
+            variableList = getVariableNames(line.stripped, "bool")
+            for variable in variableList:
+                if ( line.inPrivate or line.inProtected ):
+                    if ( not variable.startswith(("_is", "_has")) ):
+                        vList.append(Violation(self, line, variable))
+                else:
+                    if ( not variable.startswith(("is", "has")) ):
+                        vList.append(Violation(self, line, variable))
         return vList
 
 
@@ -348,12 +592,11 @@ class TestNegativeBoolean(Test):
         Test.__init__(self, 1, "", "3-28", "Avoid negative booleans.", filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                variableList = getVariableNames(line.stripped, "bool")
-                for variable in variableList:
-                    if ( re.search("[nN]ot?", variable) ):
-                        vList.append(Violation(self, line, variable))
+        for line in lines:
+            variableList = getVariableNames(line.stripped, "bool")
+            for variable in variableList:
+                if ( "no" in variable or "No" in variable ):   # [nN]ot?
+                    vList.append(Violation(self, line, variable))
         return vList
 
     
@@ -365,9 +608,8 @@ class TestEmacsHeader(Test):
                       filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            if ( not re.search("^//\s+-\*- (?:LSST-C|lsst-c)\+\+ -\*-", lines[0].raw) ):
-                vList.append(Violation(self, lines[0]))
+        if ( not _RE_EMACS_HEADER.match(lines[0].raw) ):
+            vList.append(Violation(self, lines[0]))
         return vList
 
 ###################################################################
@@ -376,18 +618,19 @@ class TestOneClassFiles(Test):
     def __init__(self, filetype, filename):
         Test.__init__(self, 1, "", "4-2", "Name .h files with one class after that class.", filetype, ["h"])
         self.filename = filename
+        self.filenameBase = os.path.basename(filename)
+        if self.filenameBase.endswith(".h"):
+            self.filenameBase = self.filenameBase[:-2]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            classNames = []
-            for line in lines:
-                if (line.inClass and (not line.className in classNames)):
-                    classNames.append(line.className)
-
-            filenameBase = re.sub(".h$", "", os.path.basename(self.filename))
-            if ( len(classNames) == 1 and not re.search("^" + classNames[0] + "$", filenameBase) ):
-                vList.append(Violation(self, line))
-                
+        classNames = set()
+        for line in lines:
+            if (line.inClass):
+                classNames.add(line.className)
+
+        if ( len(classNames) == 1 and classNames.pop() != self.filenameBase ):
+            vList.append(Violation(self, line))
+            
         return vList
 
 
@@ -398,15 +641,13 @@ class TestNonTemplateInH(Test):
         Test.__init__(self, 1, "", "4-4a", "Define all non-templated functions in .cc file", filetype, ["h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                definitionLength = getDefinitionLength(lines, line.number)
-                isTooLong = (definitionLength > 1)
-                    
-                isTemplatized = re.search("^\s*template", lines[line.number - 2].stripped)
-                if ( len(line.functionNames) > 0 and not isTemplatized and isTooLong ):
-                    vList.append(Violation(self, line))
-                
+        for line in lines:
+            if ( len(line.functionNames) == 0 or line.definitionLength <= 1 ):
+                continue
+            isTemplatized = line.prev and _RE_TEMPLATE.match(line.prev.stripped)
+            if ( not isTemplatized ):
+                vList.append(Violation(self, line))
+            
         return vList
 
     
@@ -416,18 +657,17 @@ class TestInlineProhibited(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "4-5", "Inline functions prohibited except for get/set.",
                       filetype, ["c", "cc", "h"])
+    literals = ["inline"]
     def apply(self, lines):
         vList = []
         
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                
-                if ( re.search("inline", line.stripped) ):
-                    definitionLength = getDefinitionLength(lines, line.number)
-                    isTooLong = (definitionLength > 1)
+        for line in lines:
+            
+            if ( line.hasInline ):
+                isTooLong = (line.definitionLength > 1)
 
-                    if ( len(line.functionNames) > 0 and isTooLong ):
-                        vList.append(Violation(self, line))
+                if ( len(line.functionNames) > 0 and isTooLong ):
+                    vList.append(Violation(self, line))
             
         return vList
     
@@ -440,10 +680,13 @@ class TestLength(Test):
                       filetype, ["c", "cc", "h", "py"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if ( re.search("^.{111,}$", line.raw) ):
-                    vList.append(Violation(self, line))
+        for line in lines:
+            # (the newline isn't counted)
+            length = len(line.raw)
+            if line.raw.endswith("\n"):
+                length -= 1
+            if ( length > 110 ):
+                vList.append(Violation(self, line))
         return vList
 
 
@@ -454,14 +697,15 @@ class TestAvoidSpecialChars(Test):
         Test.__init__(self, 1, "", "4-7", "Avoid special characters.", filetype, ["c", "cc", "h", "py"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if ( re.search("\t", line.stripped)):
-                    vList.append(Violation(self, line, "contains \\t"))
-                if ( re.search("\r", line.stripped)):
-                    vList.append(Violation(self, line, "contains \\r"))
-                if ( re.search("\f", line.stripped)):
-                    vList.append(Violation(self, line, "contains \\f"))
+        findSpecialChars = _RE_SPECIAL_CHARS.finditer
+        # one search of the whole file finds the lines with any of them (most have none) ...
+        for iLine in findLines(lines, _RE_SPECIAL_CHARS):
+            line = lines[iLine]
+            # ... then one scan of each of those for all three, each reported once (in the order \t, \r, \f)
+            found = set([m.lastgroup for m in findSpecialChars(line.stripped)])
+            for char in "trf":
+                if char in found:
+                    vList.append(Violation(self, line, "contains \\" + char))
         return vList
     
 
@@ -472,20 +716,19 @@ class TestPreventMultipleHeader(Test):
         Test.__init__(self, 1, "", "4-9", "Prevent multiple header inclusion.", filetype, ["h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            m1 = re.search("^\#if !defined\((LSST_[A-Z_]+_H)\)\s*$", lines[1].stripped)
-            m2 = re.search("^\#ifndef (LSST_[A-Z_]+_H)\s*$", lines[1].stripped)
-            if (not m1 and not m2):
-                vList.append(Violation(self, lines[1]))
-
-            # check the second line too, but only if the first is good
-            if m1 or m2:
-                if m1:
-                    tag = m1.group(1)
-                if m2:
-                    tag = m2.group(1)
-                if (not re.search("^\#define " + tag + "(?:\s+1)?\s*$", lines[2].stripped)):
-                    vList.append(Violation(self, lines[2]))
+        m1 = _RE_IF_NOT_DEFINED.match(lines[1].stripped)
+        m2 = _RE_IFNDEF.match(lines[1].stripped)
+        if (not m1 and not m2):
+            vList.append(Violation(self, lines[1]))
+
+        # check the second line too, but only if the first is good
+        if m1 or m2:
+            if m1:
+                tag = m1.group(1)
+            if m2:
+                tag = m2.group(1)
+            if (not compileRegex("\#define " + tag + "(?:\s+1)?\s*$").match(lines[2].stripped)):
+                vList.append(Violation(self, lines[2]))
 
         return vList
 
@@ -497,14 +740,16 @@ class TestSortGroupIncludes(Test):
         Test.__init__(self, 1, "", "4-10", "Sort and group #include statments.", filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            # angle bracket style #include<foo> should preceed quote style #include "foo.h"
-            foundQuoteStyle = False
-            for line in lines:
-                if ( re.search("^\#include\s+\"\w+\.h(pp)?\"\s*$", line.stripped) ):
-                    foundQuoteStyle = True
-                if ( foundQuoteStyle and re.search("^\#include\s*\<\w+(\.h|\.hpp)?\>\s*$", line.stripped) ):
-                    vList.append(Violation(self, line))
+        # angle bracket style #include<foo> should preceed quote style #include "foo.h"
+        foundQuoteStyle = False
+        for line in lines:
+            if ( not line.isInclude ):
+                continue
+            stripped = line.stripped
+            if ( _RE_INCLUDE_QUOTE.match(stripped) ):
+                foundQuoteStyle = True
+            if ( foundQuoteStyle and _RE_INCLUDE_ANGLE.match(stripped) ):
+                vList.append(Violation(self, line))
         return vList
 
 
@@ -517,22 +762,23 @@ class TestIncludesFirst(Test):
     def apply(self, lines):
         vList = []
 
-        if (self.getFiletype() in self.getTypeList()):
-            foundNonIncludeStatement = False
-            for line in lines:
-                
-                lineTmp = line.stripped
-                
-                # strip other preprocessor lines
-                lineTmp = re.sub("^#(define|if).*$", "", lineTmp)
+        foundNonIncludeStatement = False
+        for line in lines:
 
-                # strip 'extern' statements as they may contain #include
-                lineTmp = re.sub("^extern.*$", "", lineTmp)
-                
-                if ( not re.search("^\#include", lineTmp) and len(lineTmp.strip()) > 0 ):
-                    foundNonIncludeStatement = True
-                if ( foundNonIncludeStatement and (re.search("^\#include", lineTmp)) ):
+            if ( line.isInclude ):
+                if ( foundNonIncludeStatement ):
                     vList.append(Violation(self, line))
+                continue
+            
+            stripped = line.stripped
+            
+            # skip other preprocessor lines,
+            # and 'extern' statements as they may contain #include
+            if ( stripped.startswith(("#define", "#if", "extern")) ):
+                continue
+            
+            if ( len(stripped.strip()) > 0 ):
+                foundNonIncludeStatement = True
         return vList
     
     
@@ -540,8 +786,9 @@ class TestIncludesFirst(Test):
 # 4-13  ('using' must not appear in header)
 class TestUsingInHeader(Test):
     def __init__(self, filetype):
-        Test.__init__(self, 1, "^\s*using", "4-13",
+        Test.__init__(self, 1, _RE_USING, "4-13",
                       "'using' declaration appears in header file", filetype, ["h"])
+    prefilter = "using"
         
 
 ####################################################################
@@ -552,6 +799,7 @@ class TestAngleBracketInclude(Test):
         Test.__init__(self, 1, "^\#include\s*\<.*\/.*\>\s*$",
                       "4-15", "Use '#include<>' style for system libraries only.",
                       filetype, ["c", "cc", "h"])
+    prefilter = "#include"
 
         
 ###################################################################
@@ -561,48 +809,50 @@ class TestPubProPriv(Test):
         Test.__init__(self, 1, "", "5-2",
                       "Class declaration order public/protected/private:", filetype, ["c", "cc", "h"])
     def apply(self, lines):
-        if (self.getFiletype() in self.getTypeList()):
-            vList = []
-            order = [0, 0, 0]
-            nSeg = 0
-            for line in lines:
-                
-                if (re.search("^\s*public:", line.stripped) and line.inClass and not line.inNestedClass):
-                    if order[0]:
-                        vList.append( Violation(self, line, "'public' repeated") )
-                    nSeg += 1
-                    order[0] = nSeg
-                if (re.search("^\s*protected:", line.stripped) and line.inClass and not line.inNestedClass): 
-                    if order[1]:
-                        vList.append( Violation(self, line, "'protected' repeated") )
-                    nSeg += 1
-                    order[1] = nSeg
-                if (re.search("^\s*private:", line.stripped) and line.inClass and not line.inNestedClass): 
-                    if order[2]:
-                        vList.append( Violation(self, line, "'private' repeated") )
-                    nSeg += 1
-                    order[2] = nSeg
-                if (re.search("^\s*};\s*", line.stripped) and lines[line.number - 2].inClass and
-                    not lines[line.number - 2].inNestedClass):
-                    if (
-                        (order[0] and order[1] and order[0] > order[1]) or #pub>pro
-                        (order[1] and order[2] and order[1] > order[2]) or #pro>pri
-                        (order[0] and order[2] and order[0] > order[2])    #pub>pri
-                        ):
-                        msg = "'" + lines[line.number - 2].className + "' out of order"
-                        vList.append( Violation(self, line, msg) )
-                    order, seg = [0, 0, 0], 0
-            return vList
-        else:
-            return []
+        vList = []
+        order = [0, 0, 0]
+        nSeg = 0
+        for line in lines:
+            stripped = line.stripped
+            inOuterClass = line.inClass and not line.inNestedClass
+            m = inOuterClass and _RE_BLOCK_TAG.match(stripped)
+            tag = m.lastgroup if m else None
+            
+            if (tag == "public"):
+                if order[0]:
+                    vList.append( Violation(self, line, "'public' repeated") )
+                nSeg += 1
+                order[0] = nSeg
+            if (tag == "protected"): 
+                if order[1]:
+                    vList.append( Violation(self, line, "'protected' repeated") )
+                nSeg += 1
+                order[1] = nSeg
+            if (tag == "private"): 
+                if order[2]:
+                    vList.append( Violation(self, line, "'private' repeated") )
+                nSeg += 1
+                order[2] = nSeg
+            if (line.isClassClose):
+                prevLine = line.prev
+                if (not prevLine or not prevLine.inClass or prevLine.inNestedClass):
+                    continue
+                if (
+                    (order[0] and order[1] and order[0] > order[1]) or #pub>pro
+                    (order[1] and order[2] and order[1] > order[2]) or #pro>pri
+                    (order[0] and order[2] and order[0] > order[2])    #pub>pri
+                    ):
+                    msg = "'" + prevLine.className + "' out of order"
+                    vList.append( Violation(self, line, msg) )
+                order, seg = [0, 0, 0], 0
+        return vList
         
 
 ###################################################################
 # 5-3 (no C-style casts)
 class TestCCast(Test):
     def __init__(self, filetype):
-        ctypes = getPrimitivesOr()
-        Test.__init__(self, 1, "\((" + ctypes + ")\s*[\*]?\s*\)\s*[\w\d]+", "5-3", "C-style cast.",
+        Test.__init__(self, 1, _C_CAST_REGEX, "5-3", "C-style cast.",
                       filetype, ["c", "cc", "h"])
 
 
@@ -613,20 +863,21 @@ class TestPublicConstStatic(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "5-8", "Public variables must const or static.",
                       filetype, ["c", "cc", "h"])
+    literals = ["public:"]
 
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                # nNested counts how many blocks are nested ... greater than 1 is a variable in a function
-                if (line.inPublic and line.nNested == 1):
-                    if (len(line.variableNames) > 0):
-                        isArgument = re.search("\([^\)]+" + ".*".join(line.variableNames) + "[^\(]+\)",
-                                               line.stripped)
-                        isConstStatic = re.search("(const|static)", line.stripped)
-                        
-                    if (len(line.variableNames) > 0 and not isConstStatic and not isArgument):
-                        vList.append(Violation(self, line, "variables: " + ", ".join(line.variableNames)))
+        for line in lines:
+            stripped = line.stripped
+            # nNested counts how many blocks are nested ... greater than 1 is a variable in a function
+            if (line.inPublic and line.nNested == 1):
+                if (len(line.variableNames) > 0):
+                    isArgument = compileRegex("\([^\)]+" + ".*".join(line.variableNames) +
+                                              "[^\(]+\)").search(stripped)
+                    isConstStatic = _RE_CONST_STATIC.search(stripped)
+                    
+                if (len(line.variableNames) > 0 and not isConstStatic and not isArgument):
+                    vList.append(Violation(self, line, "variables: " + ", ".join(line.variableNames)))
         return vList
 
     
@@ -638,15 +889,12 @@ class TestConstAfterType(Test):
                       filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            stypes = getPrimitivesOr() + "|[A-Z]\w+"
-            for line in lines:
-                for variable in line.variableNames:
-                    variable = re.sub("\*", "\\*", variable) # pointers 
-                    variable = re.sub("\&", "\\&", variable) # refs
-                    regex = "const\s+(" + stypes + ")\s+" + variable
-                    if ( re.search(regex, line.stripped) ):
-                        vList.append(Violation(self, line))
+        stypes = _STYPES
+        for line in lines:
+            for variable in line.variableNames:
+                # (pointer/ref characters are escaped with the rest of the name)
+                if ( getConstAfterTypeRegex(variable, stypes).search(line.stripped) ):
+                    vList.append(Violation(self, line))
         return vList
 
 
@@ -657,15 +905,16 @@ class TestForLoopControl(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "5-14", "Put only loop control in parentheses of for() statement",
                       filetype, ["c", "cc", "h"])
+    literals = ["for", ","]
 
     # Note: this only catches one-liners ... hopefully that's most of them
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if ( re.search("^\s*for\s*\(([^;]+);([^;]+);([^;]+)\)", line.stripped) and
-                     re.search(",", line.stripped) ):
-                    vList.append(Violation(self, line))
+        for line in lines:
+            stripped = line.stripped
+            if ( line.isForHead and "," in stripped and
+                 _RE_FOR_CONTROL.match(stripped) ):
+                vList.append(Violation(self, line))
         return vList
 
 
@@ -675,6 +924,7 @@ class TestDoWhile(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "^\s*do\s*\{", "5-16", "Avoid 'do-while' loops",
                       filetype, ["c", "cc", "h"])
+    prefilter = "do"
 
 
 ###################################################################
@@ -687,25 +937,24 @@ class TestBreakContinue(Test):
     def apply(self, lines):
         vList = []
         
-        if (self.getFiletype() in self.getTypeList()):
-            inSwitch = False
-            nNested = 0
-            for line in lines:
+        inSwitch = False
+        nNested = 0
+        for line in lines:
+            
+            if (line.isSwitch):
+                inSwitch = True
+                nNested = 0
+            if (line.hasOpenBrace): nNested += 1
+            if (line.hasCloseBrace): nNested -= 1
+            if (line.hasCloseBrace and inSwitch and nNested == 0):
+                inSwitch = False
                 
-                if (re.search("^\s*switch", line.stripped)):
-                    inSwitch = True
-                    nNested = 0
-                if (re.search("\{", line.stripped)): nNested += 1
-                if (re.search("\}", line.stripped)): nNested -= 1
-                if (re.search("\}", line.stripped) and inSwitch and nNested == 0):
-                    inSwitch = False
-                    
-                if (re.search("^\s*break;", line.stripped) and not inSwitch):
-                    vList.append(Violation(self, line, "used 'break'"))
+            if (line.isBreak and not inSwitch):
+                vList.append(Violation(self, line, "used 'break'"))
 
-                if (re.search("^\s*continue;", line.stripped)):
-                    vList.append(Violation(self, line, "used 'continue'"))
-                    
+            if (line.isContinue):
+                vList.append(Violation(self, line, "used 'continue'"))
+                
         return vList
 
 ###################################################################
@@ -714,6 +963,7 @@ class TestNoOneLinerIf(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "^\s*if\s*\([^\)]+\)\s*\{[^\}]+\}", "5-21",
                       "Put conditional statements on separate line.", filetype, ["c", "cc", "h"])
+    prefilter = _RE_CONDITION_HEAD
         
 
 ###################################################################
@@ -723,6 +973,7 @@ class TestExecutibleConditional(Test):
         Test.__init__(self, 1, "^\s*(if|while)\s*\([^\)]+[^\=\!\>\<]\=[^\=][^\)]+\)", "5-22",
                       "No executible (assignments) in conditional statments.",
                       filetype, ["c", "cc", "h"])
+    prefilter = _RE_CONDITION_HEAD
 
 
 ###################################################################
@@ -735,51 +986,53 @@ class TestConstRefForNonPrimitives(Test):
     def apply(self, lines):
         vList = []
         
-        if (self.getFiletype() in self.getTypeList()):
-            primitives = getPrimitives()
-            inParentheses = False
-            for line in lines:
-                
-                declarations = []
-                
-                if (line.functionNames):
-                    inParentheses = True
-                if (inParentheses):
+        inParentheses = False
+        for line in lines:
+            stripped = line.stripped
+            
+            declarations = []
+            
+            if (line.functionNames):
+                inParentheses = True
+            if (inParentheses):
 
-                    # if the declaration is all on one line
-                    # if it contains no white space it's a variable being instantiated, not an arg list
-                    m = re.search("^[^\(]+\(([^\)]+\s[^\)]+)\)\s*[\{;]?\s*$", line.stripped)
-                    if m:
-                        declarations = m.group(1).split(",")
-                        inParentheses = False
+                # which of the regexes below can match depends on the parentheses in the line,
+                # so only those are tried
+                hasOpen, hasClose = "(" in stripped, ")" in stripped
+                
+                # if the declaration is all on one line
+                # if it contains no white space it's a variable being instantiated, not an arg list
+                m = hasOpen and hasClose and _RE_DECL_ONE_LINE.match(stripped)
+                if m and _RE_WHITESPACE.search(m.group(1), 1, len(m.group(1)) - 1):
+                    declarations = m.group(1).split(",")
+                    inParentheses = False
 
-                    # if the declaration is spread over a few lines
-                    m = re.search("^[^\(]+\(([^\)]+)$", line.stripped)               # first line
+                # if the declaration is spread over a few lines
+                if hasOpen:
+                    m = _RE_DECL_FIRST.match(stripped)                # first line
                     if m:  declarations = m.group(1).split(",")
-                    m = re.search("^\s*([^\(\)]+)$", line.stripped)                  # any middle line
+                elif not hasClose:
+                    m = _RE_DECL_MIDDLE.match(stripped)               # any middle line
                     if m:  declarations = m.group(1).split(",")
-                    m = re.search("^\s*([^\(\)]+)\s*\)(?:\s*const)?\s*[\{;:]?\s*$",
-                                  line.stripped) # last line
+                else:
+                    m = _RE_DECL_LAST.match(stripped)                 # last line
                     if m:
                         declarations = m.group(1).split(",")
                         inParentheses = False
 
-                if (inParentheses and re.search("\)(?:\s*const)?\s*[\{;:]", line.stripped)):
-                    inParentheses = False
-
-                for declaration in declarations:
-                    # if it contains no white space, it's just a function being called.
-                    # --> strip out any misleading whitespace before checking (ie. around operators)
-                    tmp = re.sub("\s*([\,\=\+\-\*\/;\(\)])\s*", r'\1', declaration.strip())
-                    if ( declaration == '\n' or not re.search("\s", tmp) ):
-                        continue
-                    isPrimitive = False
-                    for primitive in primitives:
-                        if (re.search(primitive, declaration)):
-                            isPrimitive = True
-                    if (not isPrimitive and
-                        not re.search("(const\s*\&|Ptr)", declaration)):
-                        vList.append(Violation(self, line))
+            if (inParentheses and _RE_DECL_END.search(stripped)):
+                inParentheses = False
+
+            for declaration in declarations:
+                # if it contains no white space, it's just a function being called.
+                # --> strip out any misleading whitespace before checking (ie. around operators)
+                #     (there's nothing to strip if there's no white space to begin with)
+                tmp = declaration.strip()
+                if ( not _RE_WHITESPACE.search(tmp) or
+                     not _RE_WHITESPACE.search(_RE_PUNCT_SPACE.sub(r'\1', tmp)) ):
+                    continue
+                if not _RE_PRIMITIVE_OR_CONST_REF.search(declaration):
+                    vList.append(Violation(self, line))
         return vList
         
 
@@ -791,18 +1044,19 @@ class TestOneArgConstructors(Test):
         Test.__init__(self, 1, "", "5-27",
                       "One-argument constructors must be declared explicit.",
                       filetype, ["c", "cc", "h"])
+    literals = ["public:"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if line.inPublic:
-                    # if it's only 1 arg, it should fit on one line ... there will be exceptions
-                    m = re.search("^\s*([^\(]+)\s*\([^\),]+\s[^\),]+\)", line.stripped)
-                    if m:
-                        name = re.sub(r"([\&\[\]])", r'\\\1', m.group(1))
-                        if (re.search(name, line.className) and
-                            not re.search("^\s*explicit", line.stripped)):
-                            vList.append(Violation(self, line))
+        for line in lines:
+            stripped = line.stripped
+            if line.inPublic:
+                # if it's only 1 arg, it should fit on one line ... there will be exceptions
+                m = _RE_ONE_ARG.match(stripped)
+                if m:
+                    name = _RE_NAME_SPECIAL.sub(r'\\\1', m.group(1))
+                    if (compileRegex(name).search(line.className) and
+                        not _RE_EXPLICIT.match(stripped)):
+                        vList.append(Violation(self, line))
         return vList
 
     
@@ -812,24 +1066,26 @@ class TestDestructorExceptions(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "5-28",
                       "Do not throw exceptions in a destructor.", filetype, ["c", "cc", "h"])
+    literals = ["~", "throw"]
     def apply(self, lines):
         vList = []
         
-        if (self.getFiletype() in self.getTypeList()):
-            inDestructor = False
-            nNested = 0
-            for line in lines:
+        inDestructor = False
+        nNested = 0
+        for line in lines:
+            stripped = line.stripped
+            
+            if (_RE_DESTRUCTOR.match(stripped)):
+                inDestructor = True
+                nNested = 0
+            hasCloseBrace = "}" in stripped
+            if ("{" in stripped): nNested += 1
+            if (hasCloseBrace): nNested -= 1
+            if (hasCloseBrace and inDestructor and nNested == 0):
+                inDestructor = False
+            if (inDestructor and stripped.lstrip().startswith("throw")):
+                vList.append(Violation(self, line))
                 
-                if (re.search("^\s*((?:\s*virtual\s*)\~|\w+::\~)", line.stripped)):
-                    inDestructor = True
-                    nNested = 0
-                if (re.search("\{", line.stripped)): nNested += 1
-                if (re.search("\}", line.stripped)): nNested -= 1
-                if (re.search("\}", line.stripped) and inDestructor and nNested == 0):
-                    inDestructor = False
-                if (inDestructor and re.search("^\s*throw", line.stripped)):
-                    vList.append(Violation(self, line))
-                    
         return vList
 
     
@@ -839,16 +1095,17 @@ class TestVirtualDestructor(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "5-29", "Polym. base class destructors should be virtual",
                       filetype, ["c", "cc", "h"])
+    literals = ["~"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                # virtual declaration is only in the class definition
-                isDestructor = re.search("^\s*\~", line.stripped)
-                isBaseClass = line.inClass and re.search("Base$", line.className)
-                isVirtual = re.search("^\s*virtual", line.stripped)
-                if (isDestructor and isBaseClass and not isVirtual):
-                    vList.append(Violation(self, line))
+        for line in lines:
+            stripped = line.stripped
+            # virtual declaration is only in the class definition
+            isDestructor = stripped.lstrip().startswith("~")
+            isBaseClass = line.inClass and _RE_BASE_CLASS.search(line.className)
+            isVirtual = _RE_VIRTUAL.match(stripped)
+            if (isDestructor and isBaseClass and not isVirtual):
+                vList.append(Violation(self, line))
         return vList
 
 
@@ -872,6 +1129,7 @@ class TestShowDigitBefore(Test):
 class TestNoGoto(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "\s*goto\s", "5-33", "Do not use 'goto'.", filetype, ["c", "cc", "h"])
+    prefilter = "goto"
 
         
 ###################################################################
@@ -880,14 +1138,15 @@ class TestCharStar(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "5-39", "Use std::string instead of char*.",
                       filetype, ["c", "cc", "h"])
+    literals = ["char", "*"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                # allow char * for argv[]
-                if (re.search("char\s*(const\s*)?\*", line.stripped) and
-                    not re.search("^int main", line.stripped)):
-                    vList.append( Violation(self, line) )
+        for line in lines:
+            stripped = line.stripped
+            # allow char * for argv[]
+            if (_RE_CHAR_STAR.search(stripped) and
+                not stripped.startswith("int main")):
+                vList.append( Violation(self, line) )
         return vList
 
 
@@ -898,11 +1157,10 @@ class TestCArray(Test):
         Test.__init__(self, 1, "", "5-40", "use std::vector<> instead of x[]", filetype, ["c", "cc", "h"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                for variable in line.variableNames:
-                    if (re.search("\[[^\]]+\]", variable) ):
-                        vList.append( Violation(self, line) )
+        for line in lines:
+            for variable in line.variableNames:
+                if (_RE_ARRAY_SIZE.search(variable) ):
+                    vList.append( Violation(self, line) )
         return vList
 
 
@@ -911,13 +1169,14 @@ class TestCArray(Test):
 class TestUsingOnlyStd(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "5-41", "'using' only for namespace std", filetype, ["c", "cc", "h"])
+    literals = ["using"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if ( re.search("^\s*using", line.stripped) and
-                     not re.search("\s*std\s*;\s*$", line.stripped) ):
-                    vList.append( Violation(self, line) )
+        for line in lines:
+            stripped = line.stripped
+            if ( stripped.lstrip().startswith("using") and
+                 not _RE_USING_STD.search(stripped) ):
+                vList.append( Violation(self, line) )
         return vList
 
 ###################################################################
@@ -936,50 +1195,48 @@ class TestFourSpaceIndent(Test):
     def apply(self, lines):
         vList = []
         
+        # where the '(' and '[' of the lines so far are: column -> index of the latest line with one there
+        # (a '(' only counts for a line indented one column past it if the line goes on past it)
+        openAt  = {}   # '(' or '['
+        parenAt = {}   # '(' with something after it
+        
         # don't enforce this for line continuation of argument lists or other parenthesized statements
         inParentheses = False
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
+        for iLine, line in enumerate(lines):
+            stripped = line.stripped
+            
+            if ("(" in stripped and _RE_OPEN_PAREN.search(stripped)):
+                inParentheses = True
+            # the indentation (a blank line has none) ... the rest is only needed if it's off
+            code = stripped.lstrip()
+            nLead = len(stripped) - len(code)
+            if (code and nLead % 4 != 0 and
+                not (inParentheses or code.startswith(("case", "default")))):
                 
-                if (re.search("\([^\)]+$", line.stripped)):
-                    inParentheses = True
-                m = re.search("^(\s*)[^\s]", line.stripped)
-                if (m and not (inParentheses or re.search("^\s*(case|default)", line.stripped))):
-                    leadingSpace = m.group(1)
-                    nLead = len(leadingSpace)
-                    
-                    # check and see if we're aligned to a '('
-                    # ... the inParentheses test above will fail if an arg is x = func(y)
-                    isBracketAligned = False
-                    jLine = line.number - 2   # the previous line
-
-                    while (line.number - jLine < 8 and jLine > 0):
-                        if len(lines[jLine].stripped) < (nLead + 1) or nLead == 0:
-                            jLine -= 1
-                            continue
-                        # if we're a ');', look for a '('
-                        # OR look for a '(' one space earlier
-                        if ( (re.search("[\)\]]", line.stripped[nLead]) and
-                              re.search("[\(\[]", lines[jLine].stripped[nLead]) ) or
-                             re.search("\(", lines[jLine].stripped[nLead - 1]) ):
-                            isBracketAligned = True
-                            break
-                        
-                        jLine -= 1
-
-                        
-                    # check if the last char on the prev line was ','
-                    # -- this catches argument lists that stretch over one line
-                    #   - tempting to check ';' to catch for() loops, but ';' terminates all lines
-                    m = re.search("([^\s])\s*$", lines[line.number - 2].stripped)
-                    isContinuation = False
-                    if (m and ( m.group(1) == "," )):
-                        isContinuation = True
-                            
-                    if ( nLead % 4 != 0 and not (isContinuation or isBracketAligned)):
+                # check and see if we're aligned to a '(' in one of the previous 6 lines (not the first)
+                # ... the inParentheses test above will fail if an arg is x = func(y)
+                # if we're a ');', look for a '('
+                # OR look for a '(' one space earlier
+                firstLine = max(1, iLine - 6)
+                isBracketAligned = (parenAt.get(nLead - 1, -1) >= firstLine or
+                                    (code[0] in ")]" and openAt.get(nLead, -1) >= firstLine) )
+
+                # check if the last char on the prev line was ','
+                # -- this catches argument lists that stretch over one line
+                #   - tempting to check ';' to catch for() loops, but ';' terminates all lines
+                if ( not isBracketAligned ):
+                    isContinuation = lines[line.number - 2].stripped.rstrip().endswith(",")
+                    if not isContinuation:
                         vList.append( Violation(self, line) )
-                if (inParentheses and re.search("[^\(]+\)", line.stripped)):
-                    inParentheses = False
+            if (inParentheses and ")" in stripped and _RE_CLOSE_PAREN.search(stripped)):
+                inParentheses = False
+
+            if "(" in stripped or "[" in stripped:
+                for m in _RE_OPEN_BRACKET.finditer(stripped):
+                    column = m.start()
+                    openAt[column] = iLine
+                    if m.group() == "(" and len(stripped) > column + 1:
+                        parenAt[column] = iLine
         return vList
 
     
@@ -988,15 +1245,15 @@ class TestFourSpaceIndent(Test):
 class TestKR(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "6-4", "Use K&R block style.", filetype, ["c", "cc", "h"])
+    literals = ["{"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                # a lone '{' is non-KR style, unless the previous line is blank
-                #  ... then it's ok as it denotes a block-scope
-                if (re.search("^\s*\{", line.stripped) and
-                    re.search("[^\s]+", lines[line.number - 2].stripped) ):
-                    vList.append( Violation(self, line) )
+        for line in lines:
+            # a lone '{' is non-KR style, unless the previous line is blank
+            #  ... then it's ok as it denotes a block-scope
+            if (line.stripped.lstrip().startswith("{") and
+                _RE_NON_BLANK.search(lines[line.number - 2].stripped) ):
+                vList.append( Violation(self, line) )
         return vList
        
 
@@ -1006,13 +1263,13 @@ class TestClassBlocksLeft(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "6-5", "class/public/protected/private should be left justified.",
                       filetype, ["c", "cc", "h"])
+    literals = [":"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if (re.search("^.+(class|private|protected|public):", line.stripped) and
-                    not line.inNestedClass):
-                    vList.append( Violation(self, line) )
+        for line in lines:
+            if (_RE_CLASS_ACCESS.match(line.stripped) and
+                not line.inNestedClass):
+                vList.append( Violation(self, line) )
         return vList
 
 
@@ -1021,13 +1278,13 @@ class TestClassBlocksLeft(Test):
 class TestEmptyLoopOneLine(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "6-9", "Empty loops should be on one line.", filetype, ["c", "cc", "h"])
+    literals = ["{", "}"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if (re.search("\{\s*$", line.stripped) and
-                    re.search("^\s*\}\s*$", lines[line.number].stripped) ):
-                    vList.append( Violation(self, line) )
+        for line in lines:
+            if (_RE_OPEN_BRACE_END.search(line.stripped) and
+                lines[line.number].stripped.strip() == "}" ):
+                vList.append( Violation(self, line) )
         return vList
 
     
@@ -1038,6 +1295,7 @@ class TestBracketsMissing(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "^\s*(if|for|while)\s*\([^\)]+\)\s*$", "6-14",
                       "Brackets may be omitted only for one line statements.", filetype, ["c", "cc", "h"])
+    prefilter = _RE_CONDITION_HEAD
 
     
 ###################################################################
@@ -1049,50 +1307,55 @@ class TestOperatorSpacing(Test):
     def apply(self, lines):
         vList = []
         
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-
-                mequal = re.search("(.?[\w\d]\=[^\=]|.?[^\!\&\|\+\-\*\/\=]\=[\w\d])", line.stripped)
-                mplus  = re.search("(.?[\w\d]\+[^\+\=]|.?[^\+]\+[\w\d])", line.stripped)
-                mminus = re.search("(.?[\w\d]\-[^\-\=]|.?[^\-]\-[\w\d])", line.stripped)
-
-                if mequal:
-                    isDefault = False
-                    if line.variableNames > 0:
-                        isDefaultSameLine = re.search("\([^\)]*([^=]=[^=])+[^\(]*\)", line.stripped)
-                        isDefaultDiffLine = re.search("[\d\w]=[\d\w]+(?:\<\w+\>)?(?:\(.*\))?,", line.stripped)
-                        mOvr = re.search("operator=\(", line.stripped)
-                        isDefault = isDefaultSameLine or isDefaultDiffLine or mOvr
-                    if not isDefault:
-                        vList.append(Violation(self, line, "failed '='"))
-
-                # plus and minus appear in the other contexts ... check those!
-                if mplus:
-                    match = mplus.group(1)
-                    mSciP = re.search("[\d\.][eE]\+\d", match)          #sci.not
-                    mPosP = re.search("[\:\=\+\-\*\/\(\,\<\>\?]\s*\+", match) # +ve num
-                    mOvrP = re.search("operator\+\(", line.stripped)    #operator+ overload
-                    mRetP = re.search("return\s+\+", line.stripped)    #returning +ve
-                    mEolP = re.search("\+$", line.stripped)             # end of line
-                    mBolP = re.search("^\s*\+", line.stripped)             # beginning of line
-                    if ( not (mSciP or mPosP or mOvrP or mEolP or mBolP) ): 
-                        vList.append( Violation(self, line, "failed '+'") )
-                if mminus:
-                    match = mminus.group(1)
-                    mSciN = re.search("[\d\.][eE]\-\d", match)          #sci.not
-                    mNegN = re.search("[\:\=\+\-\*\/\(\,\<\>\?]\s*\-", match) # -ve num
-                    mRetN = re.search("return\s+\-", line.stripped)     # returning -ve
-                    mOvrN = re.search("operator\-\(", line.stripped)    # operator- overload
-                    mEolN = re.search("\-$", line.stripped)             # end of line
-                    mBolN = re.search("^\s*\-", line.stripped)             # beginning of line
-                    pointDeref = re.search("\->", match)                
-                    if ( not (mSciN or mNegN or mRetN or mOvrN or mEolN or mBolN or pointDeref)):
-                        vList.append( Violation(self, line, "failed '-'") )
-
-                if ( re.search("([^\s][\!\&\|\+\-\*\/]\=|[\!\&\|\+\-\*\/]\=[^\s])", line.stripped) ):
-                    mOvr = re.search("operator[\&\|\*\+\-\/]?=\(", line.stripped)
-                    if not mOvr:
-                        vList.append( Violation(self, line, "failed '[&|+-*/]='") )
+        for line in lines:
+
+            # every check below needs a '=', '+' or '-' in the line; most lines have none
+            stripped = line.stripped
+            hasEqual = "=" in stripped
+            if not (hasEqual or "+" in stripped or "-" in stripped):
+                continue
+            
+            mequal = hasEqual and _RE_EQUAL.search(stripped)
+            mplus  = "+" in stripped and _RE_PLUS.search(stripped)
+            mminus = "-" in stripped and _RE_MINUS.search(stripped)
+
+            if mequal:
+                isDefault = False
+                if line.variableNames > 0:
+                    isDefaultSameLine = _RE_DEFAULT_SAME_LINE.search(stripped)
+                    isDefaultDiffLine = _RE_DEFAULT_DIFF_LINE.search(stripped)
+                    mOvr = _RE_OPERATOR_EQUAL.search(stripped)
+                    isDefault = isDefaultSameLine or isDefaultDiffLine or mOvr
+                if not isDefault:
+                    vList.append(Violation(self, line, "failed '='"))
+
+            # plus and minus appear in the other contexts ... check those!
+            if mplus:
+                match = mplus.group(1)
+                mSciP = _RE_SCI_PLUS.search(match)                #sci.not
+                mPosP = _RE_POSITIVE.search(match)                # +ve num
+                mOvrP = _RE_OPERATOR_PLUS.search(stripped)        #operator+ overload
+                mRetP = _RE_RETURN_PLUS.search(stripped)          #returning +ve
+                mEolP = _RE_EOL_PLUS.search(stripped)             # end of line
+                mBolP = _RE_BOL_PLUS.match(stripped)              # beginning of line
+                if ( not (mSciP or mPosP or mOvrP or mEolP or mBolP) ): 
+                    vList.append( Violation(self, line, "failed '+'") )
+            if mminus:
+                match = mminus.group(1)
+                mSciN = _RE_SCI_MINUS.search(match)               #sci.not
+                mNegN = _RE_NEGATIVE.search(match)                # -ve num
+                mRetN = _RE_RETURN_MINUS.search(stripped)         # returning -ve
+                mOvrN = _RE_OPERATOR_MINUS.search(stripped)       # operator- overload
+                mEolN = _RE_EOL_MINUS.search(stripped)            # end of line
+                mBolN = _RE_BOL_MINUS.match(stripped)             # beginning of line
+                pointDeref = _RE_POINTER_DEREF.search(match)
+                if ( not (mSciN or mNegN or mRetN or mOvrN or mEolN or mBolN or pointDeref)):
+                    vList.append( Violation(self, line, "failed '-'") )
+
+            if ( hasEqual and _RE_COMPOUND_ASSIGN.search(stripped) ):
+                mOvr = _RE_OPERATOR_COMPOUND.search(stripped)
+                if not mOvr:
+                    vList.append( Violation(self, line, "failed '[&|+-*/]='") )
 
         return vList
 
@@ -1105,18 +1368,19 @@ class TestCommaSpace(Test):
         Test.__init__(self, 1, "", "6-16b", "Missing whitespace.", filetype, ["c", "cc", "h", "py"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                # careful, comma followed by \n is ok.
-                if ( re.search(",[^\s]", line.stripped) and not re.search(",\s*$", line.stripped) ):
-                    vList.append( Violation(self, line, "after comma") )
-                m = re.search("^\s*(for|if|while|else|switch)[^\s\w]", line.stripped)
-                if (m and re.search("^(cc|c|h)$", self.getFiletype())):
-                    rword = m.group(1)
-                    vList.append( Violation(self, line, "after reserved word '" + rword + "'") )
-                # semi as last character is ok
-                if ( re.search(";[^\s]", line.stripped) and not re.search(";$", line.stripped)):
-                    vList.append( Violation(self, line, "after semi-colon") )
+        isC = self.filetype in ["cc", "c", "h"]   # the same for every line
+        for line in lines:
+            stripped = line.stripped
+            # careful, comma followed by \n is ok.
+            if ( _RE_COMMA_NO_SPACE.search(stripped) and not _RE_COMMA_EOL.search(stripped) ):
+                vList.append( Violation(self, line, "after comma") )
+            m = isC and _RE_RESERVED_NO_SPACE.match(stripped)
+            if (m):
+                rword = m.group(1)
+                vList.append( Violation(self, line, "after reserved word '" + rword + "'") )
+            # semi as last character is ok
+            if ( _RE_SEMI_NO_SPACE.search(stripped) and not _RE_SEMI_EOL.search(stripped)):
+                vList.append( Violation(self, line, "after semi-colon") )
 
         return vList
 
@@ -1127,14 +1391,16 @@ class TestCommaSpace(Test):
 class TestNestedNamespacesLeft(Test):
     def __init__(self, filetype):
         Test.__init__(self, 1, "", "6-21b", "Left-align nested namespaces.", filetype, ["c", "cc", "h"])
+    literals = ["namespace"]
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if ( re.search("namespace.*namespace", line.stripped) ):
-                    vList.append( Violation(self, line) )
-                if ( re.search("^\s+namespace", line.stripped) ):
-                    vList.append( Violation(self, line) )
+        for iLine in findLines(lines, "namespace"):
+            line = lines[iLine]
+            stripped = line.stripped
+            if ( _RE_NESTED_NAMESPACE.search(stripped) ):
+                vList.append( Violation(self, line) )
+            if ( _RE_INDENTED_NAMESPACE.match(stripped) ):
+                vList.append( Violation(self, line) )
         return vList
 
 
@@ -1146,10 +1412,9 @@ class TestDefault(Test):
         Test.__init__(self, 1, "", "", "", filetype, ["c", "cc", "h", "py"])
     def apply(self, lines):
         vList = []
-        if (self.getFiletype() in self.getTypeList()):
-            for line in lines:
-                if ( re.search(Test.getRegex(self), line.stripped) ):
-                    vList.append( Violation(self, line) )
+        for line in lines:
+            if ( self._re.search(line.stripped) ):
+                vList.append( Violation(self, line) )
         return vList
 
 
@@ -1158,9 +1423,12 @@ class TestDefault(Test):
 ###################################################################
 # class Violation
 # - Each violation is stored as an instance of this class
+# - the comment is only put together for the violations which are printed
 #
 ###################################################################
-class Violation():
+class Violation(object):
+    __slots__ = ("test", "line", "lineNumber", "extraComment")
+    
     def __init__(self, test, line, extraComment = ""):
         self.test = test
         self.line = line
@@ -1171,36 +1439,114 @@ class Violation():
         extraComment = ""
         if ( len(self.extraComment) > 0 ):
             extraComment = " (" + self.extraComment + ")"
-        return self.test.getComment() + extraComment
+        return self.test.comment + extraComment
     
-    def getId(self):         return self.test.getId()    
-    def getSeverity(self):   return self.test.getSeverity()
+    def getId(self):         return self.test.id
+    def getSeverity(self):   return self.test.severity
     def getLineNumber(self): return self.lineNumber
         
 
 ###################################################################
 # class Line
 # - Information about each line is stored in this structure
+# - there's one for every line of the file, so they have __slots__ rather than a __dict__
 #
 ###################################################################
-class Line():
+# - the lists of names start empty, and as they're only ever read, the Lines all share one
+# - the context (inClass, nNested, etc) is set for every line by flagLines(), so isn't set here
+_NO_NAMES = ()
+
+class Line(object):
+    __slots__ = ("stripped", "raw", "number", "variableNames", "functionNames", "templateNames",
+                 "inClass", "inStruct", "inPublic", "inProtected", "inPrivate",
+                 "inNestedClass", "inNestedStruct", "className", "structName", "nNested",
+                 "suppress", "prev", "next", "definitionLength",
+                 "hasOpenBrace", "hasCloseBrace", "hasInline", "isSwitch", "isBreak",
+                 "isContinue", "isForHead", "isInclude", "isClassClose")
+    
     def __init__(self, raw, stripped):
         self.stripped = stripped
         self.raw = raw
         self.number = 0
-        self.variableNames = []
-        self.functionNames = []
-        self.templateNames = []
-        self.inClass       = False
-        self.inStruct      = False
-        self.inPublic      = False
-        self.inProtected   = False
-        self.inPrivate     = False
-        self.inNestedClass  = False
-        self.inNestedStruct = False
+        self.variableNames = _NO_NAMES   # set by flagLines() (if the line could have any)
+        self.functionNames = _NO_NAMES
+        self.templateNames = _NO_NAMES
         self.className      = ""
         self.structName     = ""
-        self.suppress       = []
+        self.suppress       = _NO_NAMES
+        self.prev           = None   # the neighbouring Lines, set by parseLines()
+        self.next           = None
+        self.definitionLength = -1   # see setDefinitionLengths()
+
+        # features of the stripped line, set True by flagLines() if they're found
+        self.hasOpenBrace   = False
+        self.hasCloseBrace  = False
+        self.hasInline      = False
+        self.isSwitch       = False
+        self.isBreak        = False
+        self.isContinue     = False
+        self.isForHead      = False
+        self.isInclude      = False
+        self.isClassClose   = False
+
+
+###################################################################
+# Function getStrippedText
+# - returns the stripped lines joined into one '\n' separated string,
+#   and a list of the position in that string where each line starts
+# - the tests share the result for the file being checked, so it's only built once
+###################################################################
+_strippedText = [None, "", []]   # lines, text, starts
+
+def getStrippedText(lines):
+    if _strippedText[0] is not lines:
+        starts = []
+        pos = 0
+        for line in lines:
+            starts.append(pos)
+            pos += len(line.stripped) + 1
+        _strippedText[:] = [lines, "\n".join([line.stripped for line in lines]), starts]
+    return _strippedText[1], _strippedText[2]
+
+
+###################################################################
+# Function findLines
+# - returns the index of each line in which 'pattern' (a string, or a regex compiled with re.M,
+#   so ^ and $ still mark the lines) is found, searching the whole stripped text at once
+# - a match in the text can run on into the next line, so the caller must check each line itself,
+#   and the search resumes at the start of the following line
+# - the lines found for each pattern are kept for the file being checked, so a pattern
+#   shared by several tests is only searched for once
+###################################################################
+_foundLines = [None, {}]   # lines, {pattern: line indices}
+
+def findLines(lines, pattern):
+    if _foundLines[0] is not lines:
+        _foundLines[:] = [lines, {}]
+    found = _foundLines[1].get(pattern)
+    if found is None:
+        found = _foundLines[1][pattern] = []
+        text, starts = getStrippedText(lines)
+        nLines, nText = len(lines), len(text)
+        isLiteral = isinstance(pattern, str)
+        pos = 0
+        while pos < nText:
+            if isLiteral:
+                start = text.find(pattern, pos)
+                if start < 0:
+                    break
+            else:
+                m = pattern.search(text, pos)
+                if not m:
+                    break
+                start = m.start()
+            iLine = bisect.bisect_right(starts, start) - 1
+            found.append(iLine)
+            if iLine + 1 >= nLines:
+                break
+            pos = starts[iLine + 1]
+    return found
+
         
 ###################################################################
 # Function flagLines
@@ -1222,38 +1568,51 @@ def flagLines(lines):
     className = ""
     structName = ""
     
+    # everything used on every line, looked up once
+    findFeatures, matchBlockTag = _RE_FEATURES.finditer, _RE_BLOCK_TAG.match
+    featureAttributes = _FEATURE_ATTRIBUTES
+    searchLetter = _RE_LETTER.search
+    
     for line in lines:
+        stripped = line.stripped
 
-        # class information
-        m = re.search("^\s*class\s+(\w+)\s*:?\s+", line.stripped)
+        # features used by several tests, all found in one scan (most lines have none)
+        for m in findFeatures(stripped):
+            for feature in featureAttributes[m.lastgroup]:
+                setattr(line, feature, True)
+
+        # class/struct blocks and the sections in them (most lines are neither)
+        m = matchBlockTag(stripped)
         if m:
-            className = m.group(1)
-            if inClass or inStruct:
-                inNestedClass = True
-            inClass, inStruct, inPublic, inProtected, inPrivate = True, False, False, False, False
+            tag = m.lastgroup
             
-        # struct information
-        m = re.search("^\s*struct\s+(\w+)\s*:?\s+", line.stripped)
-        if m:
-            structName = m.group(1)
-            if (inClass or inStruct):
-                inNestedStruct = True
-            inClass, inStruct, inPublic, inProtected, inPrivate = False, True, False, False, False
-
-        justInClassStruct = (inClass or inStruct) and not (inNestedClass or inNestedStruct)
-        if ((justInClassStruct) and re.search("^\s*public:", line.stripped)):
-            inPublic, inProtected, inPrivate = True,  False, False
-        if ((justInClassStruct) and re.search("^\s*protected:", line.stripped)): 
-            inPublic, inProtected, inPrivate = False, True,  False
-        if ((justInClassStruct) and re.search("^\s*private:", line.stripped)):
-            inPublic, inProtected, inPrivate = False, False, True
-        if ((justInClassStruct) and re.search("^};\s*", line.stripped)):
-            inClass, inStruct, inPublic, inProtected, inPrivate = False, False, False, False, False
+            # class information
+            if tag == "className":
+                className = intern(m.group(tag))    # shared by all the lines in the class
+                if inClass or inStruct:
+                    inNestedClass = True
+                inClass, inStruct, inPublic, inProtected, inPrivate = True, False, False, False, False
             
-        if (inNestedClass and re.search("^};\s*", line.stripped)):
-            inNestedClass = False
-        if (inNestedStruct and re.search("^\};\s*", line.stripped)):
-            inNestedStruct = False
+            # struct information
+            elif tag == "structName":
+                structName = intern(m.group(tag))
+                if (inClass or inStruct):
+                    inNestedStruct = True
+                inClass, inStruct, inPublic, inProtected, inPrivate = False, True, False, False, False
+
+            # sections, and the end, of a class/struct that isn't nested
+            elif (inClass or inStruct) and not (inNestedClass or inNestedStruct):
+                if tag == "public":
+                    inPublic, inProtected, inPrivate = True,  False, False
+                elif tag == "protected":
+                    inPublic, inProtected, inPrivate = False, True,  False
+                elif tag == "private":
+                    inPublic, inProtected, inPrivate = False, False, True
+                else:
+                    inClass, inStruct, inPublic, inProtected, inPrivate = False, False, False, False, False
+            
+            if tag == "blockEnd":
+                inNestedClass, inNestedStruct = False, False
             
         line.inClass        = inClass
         line.inStruct       = inStruct
@@ -1268,8 +1627,8 @@ def flagLines(lines):
         if inStruct:
             line.structName = structName
 
-        if (re.search("\{", line.stripped)): nNested += 1
-        if (re.search("\}", line.stripped)): nNested -= 1
+        if (line.hasOpenBrace): nNested += 1
+        if (line.hasCloseBrace): nNested -= 1
 
         line.nNested = nNested
 
@@ -1281,9 +1640,12 @@ def flagLines(lines):
         #print char + " " + line.stripped,
         
         # variables, functions, templates
-        line.variableNames = getVariableNames(line.stripped)
-        line.functionNames = getFunctionNames(line.stripped)
-        line.templateNames = getTemplateNames(line.stripped)
+        # - each is found by the name of a type (or 'template') ... without a letter there's no name,
+        #   and the blank and brace-only lines (and comments, once stripped) are left with the empty lists
+        if searchLetter(stripped):
+            line.variableNames = getVariableNames(stripped)
+            line.functionNames = getFunctionNames(stripped)
+            line.templateNames = getTemplateNames(stripped)
 
     return lines
 
@@ -1292,60 +1654,83 @@ def flagLines(lines):
 # Function parseLines
 # - removes all non-code strings (comments and quoted strings)
 # - be careful not to delete lines! that will break the line number count
+# - 'text' is the lines joined together, if the caller has it already
 #
 ###################################################################
-def parseLines(lines, filetype):
+def parseLines(lines, filetype, text = None):
 
     inComment = False
     inPyDoc = False
     newLines = []
     iLine = 0
+    isC  = filetype in ["c", "cc", "h"]
+    isPy = filetype in ["py"]
+
+    # look through the whole file once for what the lines may need done to them,
+    # so the per-line checks below are skipped entirely if it has none of it
+    if text is None:
+        text = "".join(lines)
+    hasSlash    = isC and "/" in text
+    hasQuote    = '"' in text
+    hasPyMarks  = isPy and (hasQuote or "#" in text)
+    hasSuppress = "parasoft-suppress" in text
+    
     for raw in lines:
 
         iLine += 1
         stripped = raw
 
+        # Each substitution below needs a particular character (or pair) to be in the line,
+        # and most lines have none of them, so look for those with 'in' before running the regex.
+        
         #################################################
         # C/C++ comments
-        if ( filetype in ["c", "cc", "h"] ):
+        # (all the comment markers have a '/', so one look for that rules them all out)
+        if ( hasSlash and (inComment or "/" in stripped) ):
             # /* */ style
-            if ( re.search("\/\*", stripped) and not inComment):
-                if ( re.search("\*\/", stripped) ):
-                    stripped = re.sub("\/\*.+?\*\/", "", stripped)
+            if ( "/*" in stripped and not inComment):
+                if ( "*/" in stripped ):
+                    stripped = _RE_C_COMMENT.sub("", stripped)
                 else:
-                    stripped = re.sub("\/\*.*$", "", stripped)
+                    stripped = _RE_C_COMMENT_START.sub("", stripped)
                     inComment = True
-            if ( re.search("\*\/", stripped) and inComment ):
-                stripped = re.sub("^.*\*\/", "", stripped)
-                inComment = False
             if ( inComment ):
-                stripped = ""
-            stripped = re.sub("\/\/\/<.*$", "", stripped) # C doxygen style comments
-            stripped = re.sub("\/\/+.*$", "", stripped)   # C // style comments
+                if ( "*/" in stripped ):
+                    stripped = _RE_C_COMMENT_END.sub("", stripped)
+                    inComment = False
+                else:
+                    stripped = ""
+            # (this takes everything from the first '//', doxygen '///<' comments included)
+            if ( "//" in stripped ):
+                stripped = _RE_CPP_COMMENT.sub("", stripped)
+        if ( isC and hasQuote ):
 
             # kill normal strings, but leave #included filenames alone
-            if ( not re.search("^\#include", stripped) ):
-                stripped = re.sub("\"[^\"]*\"", "\"\"", stripped) 
+            if ( '"' in stripped and not stripped.startswith("#include") ):
+                stripped = _RE_STRING.sub("\"\"", stripped) 
 
         ################################################
         # Python comments
-        if (filetype in ["py"]):
+        if ( hasPyMarks ):
             # handle """  """ python strings
-            if ( re.search("\"\"\"", stripped) and not inPyDoc ):
-                if ( re.search("\"\"\".*?\"\"\"", stripped) ):
-                    stripped = re.sub("\"\"\".*?\"\"\"", "", stripped)
+            if ( '"""' in stripped and not inPyDoc ):
+                if ( _RE_PY_DOC.search(stripped) ):
+                    stripped = _RE_PY_DOC.sub("", stripped)
                 else:
-                    stripped = re.sub("\"\"\".*$", "", stripped)
+                    stripped = _RE_PY_DOC_START.sub("", stripped)
                     inPyDoc = True
-            if ( re.search(".*\"\"\"", stripped) and inPyDoc):
-                stripped = re.sub("^.*\"\"\"", "", stripped)
-                inPyDoc = False
             if ( inPyDoc ):
-                stripped = ""
+                if ( '"""' in stripped ):
+                    stripped = _RE_PY_DOC_END.sub("", stripped)
+                    inPyDoc = False
+                else:
+                    stripped = ""
 
-            stripped = re.sub("\\\\\"", "", stripped)         # kill escaped \" characters
-            stripped = re.sub("\"[^\"]*\"", "\"\"", stripped) # kill normal strings
-            stripped = re.sub("#.*$", "", stripped)           # kill python comments
+            if ( '"' in stripped ):
+                stripped = _RE_ESCAPED_QUOTE.sub("", stripped)    # kill escaped \" characters
+                stripped = _RE_STRING.sub("\"\"", stripped)        # kill normal strings
+            if ( "#" in stripped ):
+                stripped = _RE_PY_COMMENT.sub("", stripped)       # kill python comments
             
         ####################################################
         # create the line structure 
@@ -1356,11 +1741,20 @@ def parseLines(lines, filetype):
 
         ####################################################
         # note if what's being suppressed
-        m = re.search("parasoft-suppress\s+([^\"]+)", raw)
-        if m:
-            line.suppress += m.group(1).split()
+        # - kept as the set of our rules ('LsstDm-<rule>') named, so a violation is looked up directly
+        if ( hasSuppress and "parasoft-suppress" in raw ):
+            m = _RE_SUPPRESS.search(raw)
+            if m:
+                line.suppress = frozenset([name[len("LsstDm-"):] for name in m.group(1).split()
+                                           if name.startswith("LsstDm-")])
         
     flaggedLines = flagLines(newLines)
+
+    # link each line to its neighbours
+    for iLine in range(1, len(flaggedLines)):
+        flaggedLines[iLine].prev = flaggedLines[iLine - 1]
+        flaggedLines[iLine - 1].next = flaggedLines[iLine]
+    setDefinitionLengths(flaggedLines)
     return flaggedLines
 
 
@@ -1384,65 +1778,192 @@ def getPrimitivesOr():
 def getUserTypeRegex():
     return "[A-Z]\w+(?:\<\w+\>)?";
 
+# the above don't change, so build them once for the tests
+# - _STYPES is the regex 'or' of standard types, and user-defined ones ([A-Z]\w+)
+# - _VARIABLE_STYPES is the same for getVariableNames(), where a user type can be a template
+_PRIMITIVES_OR = getPrimitivesOr()
+_STYPES        = _PRIMITIVES_OR + "|[A-Z]\w+"
+_VARIABLE_STYPES = _PRIMITIVES_OR + "|" + getUserTypeRegex()
+_C_CAST_REGEX  = "\((" + _PRIMITIVES_OR + ")\s*[\*]?\s*\)\s*[\w\d]+"
+
+# 5-24: an argument of a primitive type, or passed as 'const &' or a Ptr, is fine
+# (one search for either, rather than one for each ... a primitive type is found anywhere in the
+#  text, so 'int' is found in 'Point' too, as it always was)
+_RE_PRIMITIVE_OR_CONST_REF = re.compile(_PRIMITIVES_OR + r"|const\s*\&|Ptr")
+
+# used by getVariableNames() to tidy up every line, compiled once
+_RE_CONST_KEYWORD      = re.compile(r"const(\s*=\s*0)?")
+_RE_WHITESPACE_RUN     = re.compile(r"\s+")
+# - a space on either side of any of these is dropped (once the whitespace is collapsed to single
+#   spaces, a replace() for each is half the cost of the regex substitution)
+# - each space is between two other characters then, so which is dropped first doesn't matter,
+#   and each mark is looked for just once, with its spaced forms
+_SPACED_PUNCTUATION    = [(punct, " " + punct, punct + " ") for punct in ",=+-/;()?:><"]
+
+# ... and to pick out the declarations in it
+_RE_ARG_LIST_COMMA     = re.compile(r"[^\=]+\([^\)]+\,[^\)]+\)")  # a function's arguments
+_RE_ARG_LIST_SPACE     = re.compile(r"\([^\)]+\s[^\)]+\)")
+_RE_NEW_ARG            = re.compile(r"\(new\s[^\)]+\)")
+_RE_TERNARY            = re.compile(r"\([^\)]+\)\s*\?\s*")
+_RE_OPEN_PAREN_PREFIX  = re.compile(r"[^\(]+\(")
+_RE_SCOPED_CALL        = re.compile(r"[^\(]+::[^\(]+\(")
+_RE_UNMATCHED_CLOSE    = re.compile(r"[^\(]+\)\s*[;\{]?\s*$")
+_RE_AFTER_COLON        = re.compile(r"[^:]:([^:].*)$")        # a single colon
+_RE_PAREN_CHAR         = re.compile(r"([\(\)])")
+_RE_RETURN             = re.compile(r"\s*return\s")
+_RE_COMMA_LIST         = re.compile(r"[^\s]\s*\,\s*[^\s]")
+# - an '=' assignment, or a '()' one before it (one with an '=' in it is cut at the '=', as ever)
+_RE_ASSIGNMENT         = re.compile(r"=.*$|\([^\)\=]*\)")
+
+# - the parts of a declaration after the type (which can be given to getVariableNames())
+_POINT_REF    = "(?:\s+[\&\*]\s*|[\&\*]\s+|\s+)"
+_PLAIN_VAR    = "\w[\w\d]*"         # plain variable ... no assignment
+_ASSIGNED_VAR = "\=[^\s\,]+"        # catch generic declaration: double const Foo = 5;
+_INSTANT_VAR  = "\s?\([^\)]+\)"     # catch instantiation:       double const Foo(5);
+_ARRAY_VAR    = "\s?\[[^\]]+\]"     # catch arrays
+_RE_DECLARED_VARIABLE  = re.compile("(" + _PLAIN_VAR + "(?:" +
+                                    _ASSIGNED_VAR + "|" + _INSTANT_VAR + "|" + _ARRAY_VAR + ")?)$")
+
+###################################################################
+# function getDeclarationRegexes
+# - returns the letters a declaration of one of the 'stypes' can start with, the match() of
+#   one, and the sub() to strip off its type
+# - the letters let most candidates be passed over without the regex (they're None if
+#   the 'stypes' aren't all plain words and [A-Z] classes, and then every candidate is tried)
+# - only a few different 'stypes' are used, so they're built once for each and kept
+###################################################################
+_declarationRegexes = {}
+
+def getDeclarationRegexes(stypes):
+    regexes = _declarationRegexes.get(stypes)
+    if regexes is None:
+        initials = set()
+        for stype in stypes.split("|"):
+            if stype[:1].isalpha():
+                initials.add(stype[0])
+            elif stype.startswith("[A-Z]"):
+                initials.update(string.ascii_uppercase)
+            else:
+                initials = None
+                break
+        if initials is not None:
+            initials = frozenset(initials)
+        base = "^(?:" + stypes + ")"
+        regexes = _declarationRegexes[stypes] = (initials,
+                                                 re.compile(base + _POINT_REF + _PLAIN_VAR).match,
+                                                 re.compile(base).sub)
+    return regexes
+
+# the types every file is checked for (all variables, and 'bool' for 3-24 and 3-28) are known
+# beforehand, so they're built now ... and the worker processes (see main()) start with them
+for stypes in (_VARIABLE_STYPES, "bool"):
+    getDeclarationRegexes(stypes)
+
+
 ###################################################################
 # function getVariableNames
 # - returns a list of variable Names defined on the given line
 # - can specify the type of the variable
+# - the names found for each line (and type) are kept, as the same line often turns up more
+#   than once (3-24 and 3-28 both look for 'bool' on every line) ... the lists are shared,
+#   so they mustn't be changed
 ###################################################################
-def getVariableNames(line, stypes = getPrimitivesOr() + "|" + getUserTypeRegex()):
+_variableNames = {}
+_MAX_VARIABLE_NAMES = 50000   # forget them all beyond this, so a long run can't grow forever
+
+def getVariableNames(line, stypes = _VARIABLE_STYPES):
+    key = (line, stypes)
+    variableList = _variableNames.get(key)
+    if variableList is None:
+        if len(_variableNames) >= _MAX_VARIABLE_NAMES:
+            _variableNames.clear()
+        variableList = _variableNames[key] = findVariableNames(line, stypes)
+    return variableList
+
+
+###################################################################
+# function findVariableNames
+# - does the work for getVariableNames()
+###################################################################
+def findVariableNames(line, stypes):
 
     # clear out 'const', 'static', and some whitespace ... makes the regex matching easier
     # kill possible 'const = 0' as that denote a virtual function
+    # (in this order: removing one word can leave another behind; the plain words needn't be regexes)
     originalLine = line
-    line = re.sub("const(\s*=\s*0)?", "", line)
-    line = re.sub("static", "", line)
-    line = re.sub("typename", "", line)
-    
-    line = re.sub("^\s+", "", line)
-    line = re.sub("\s+", " ", line)
-    line = re.sub("\s*([\,\=\+\-\/;\(\)\?\:\>\<])\s*", r'\1', line)
+    if "const" in line:
+        line = _RE_CONST_KEYWORD.sub("", line)
+    line = line.replace("static", "")
+    line = line.replace("typename", "")
+
+    # a type given as a plain word (3-24 and 3-28 ask for 'bool' on every line) has to be on the
+    # line for anything to be declared with it ... most lines can be passed over here
+    # (only now, as taking out the words above could have joined one)
+    if stypes.isalnum() and stypes not in line:
+        return []
+
+    # collapse the whitespace, then drop what's left of any leading whitespace
+    line = _RE_WHITESPACE_RUN.sub(" ", line)
+    if line.startswith(" "):
+        line = line[1:]
+    for punct, spacedBefore, spacedAfter in _SPACED_PUNCTUATION:
+        if punct in line:
+            line = line.replace(spacedBefore, punct).replace(spacedAfter, punct)
 
     #######################################################################
     # if it's a function declaration, extract the argument list
     
     # match comma in () ... must be a function  ... not true, could be instantiation
     #  ... yikes: could be assigned to a function
+    # (the first three need a '(', and the first two a ')' as well, while the last needs a ')'
+    #  without one ... most lines have neither, so these are sorted out without any regex)
+    # (once a branch has found its part of the line, it's cut out by slicing where a regex
+    #  substitution would only have searched for it again)
     rawList = [line]
-    if (re.search("[^\=]+\([^\)]+\,[^\)]+\)", line)):
-        line = re.sub("^[^\(]+\(", "", line)
-        line = re.sub("\)[^\)]*$", "", line)
+    hasOpen, hasClose = "(" in line, ")" in line
+    if (hasOpen and hasClose and _RE_ARG_LIST_COMMA.search(line)):
+        before, paren, after = line.partition("(")     # up to the first '(' ... if anything's before it
+        if before:
+            line = after
+        before, paren, after = line.rpartition(")")    # and from the last ')'
+        if paren:
+            line = before
         rawList = line.split(",")
 
     # or else ... if there's whitespace between the parens and it's not a 'new' something
     # ... that's a function too
-    elif (re.search("\([^\)]+\s[^\)]+\)", line) and
-          not re.search("\(new\s[^\)]+\)", line) and
-          not re.search("\([^\)]+\)\s*\?\s*", line) ):     #don't strip a ternary conditional
-        line = re.sub("[^\(]+\(", "", line)
-        line = re.sub("\)[^\)]*$", "", line)
+    elif (hasOpen and hasClose and _RE_ARG_LIST_SPACE.search(line) and
+          not _RE_NEW_ARG.search(line) and
+          not _RE_TERNARY.search(line) ):     #don't strip a ternary conditional
+        line = _RE_OPEN_PAREN_PREFIX.sub("", line)
+        before, paren, after = line.rpartition(")")
+        if paren:
+            line = before
         rawList = [line]
 
-    # if there are "::" before '(', it's probably a function ... grab any arguments
-    elif (re.search("[^\(]+::[^\(]+\(", line)):
-        line = re.sub("[^\(]+::[^\(]+\(", "", line)
-        if (re.search("\)[^\)]*", line)):
-            line = re.sub("\)[^\)]*", "", line)
-        rawList = [line]
+    else:
+        # if there are "::" before '(', it's probably a function ... grab any arguments
+        m = hasOpen and _RE_SCOPED_CALL.search(line)
+        if m:
+            line = line[:m.start()] + _RE_SCOPED_CALL.sub("", line[m.end():])
+            line = line.partition(")")[0]
+            rawList = [line]
 
-    # if there's an unmatched ')' at the end of the line, it's a continuation of an arg list
-    elif (re.search("^[^\(]+\)\s*[;\{]?\s*$", line)):
-        line = re.sub("\)\s*[;\{]?\s*$", "", line)
-        rawList = [line]
+        # if there's an unmatched ')' at the end of the line, it's a continuation of an arg list
+        # (that ')' is the last one, as only whitespace and a ';' or '{' can follow it)
+        elif (hasClose and not hasOpen and _RE_UNMATCHED_CLOSE.match(line)):
+            line = line.rpartition(")")[0]
+            rawList = [line]
 
         
     #############################################################################
     # eliminate other possible confusing parts
         
     # if we see a single colon, we want nothing after it (probably setting private vars from arg list)
-    m = re.search("[^:]:([^:].*)$", line)
+    m = ":" in line and _RE_AFTER_COLON.search(line)
     if m:
-        s = re.sub("([\(\)])", r'\\\1', m.group(1))
-        line = re.sub(":" + s + "$", "", line)
+        s = _RE_PAREN_CHAR.sub(r'\\\1', m.group(1))
+        line = compileRegex(":" + s + "$").sub("", line)
         rawList = [line]
         
     ###########################################################################
@@ -1453,45 +1974,34 @@ def getVariableNames(line, stypes = getPrimitivesOr() + "|" + getUserTypeRegex()
     for raw in rawList:
 
         # don't get fooled by return statements
-        if re.search("^\s*return\s", raw):
+        if raw.lstrip().startswith("return") and _RE_RETURN.match(raw):
             continue
         
-        base = "^(?:" + stypes + ")"
-        pointRef = "(?:\s+[\&\*]\s*|[\&\*]\s+|\s+)"
-        plainVar = "\w[\w\d]*"         # plain variable ... no assignment
-        
         # do a triage step to see if the line looks like a variable declaration
-        if ( not re.search(base + pointRef + plainVar, raw) ): continue
-
-        # catch generic declaration: double const Foo = 5;
-        assignedVar = "\=[^\s\,]+"
-        # catch instantiation:       double const Foo(5);
-        instantVar = "\s?\([^\)]+\)"
-        # catch arrays
-        arrayVar   = "\s?\[[^\]]+\]"
+        initials, matchDeclaration, subType = getDeclarationRegexes(stypes)
+        if ( initials is not None and raw[:1] not in initials ): continue
+        if ( not matchDeclaration(raw) ): continue
 
         # if there are commas, look for multiple variables
-        if ( re.search("[^\s]\s*\,\s*[^\s]", raw) ):
+        # (but not for a ',' at either end ... only the regex can tell, if there's one at all)
+        if ( "," in raw and _RE_COMMA_LIST.search(raw) ):
             rawSplitList = raw.split(",")
         else:
-            rawSplitList = [raw]
+            rawSplitList = (raw,)
 
         variables = []
         for rawSplit in rawSplitList:
-            rawSplit = re.sub(base, "", rawSplit)    # strip off the type
-            rawSplit = re.sub(";\s*$", "", rawSplit) # remove the ';'
-            regex = ("(" + plainVar + "(?:" +
-                     assignedVar + "|" + instantVar + "|" + arrayVar + ")?)$")
-            m = re.search(regex, rawSplit)
+            rawSplit = subType("", rawSplit)    # strip off the type
+            rawSplit = _RE_DECLARATION_END.sub("", rawSplit) # remove the ';'
+            m = _RE_DECLARED_VARIABLE.search(rawSplit)
             if m:
                 variables.append(m.group(1))
 
         for variable in variables:
             if variable != '\n':
-                variable = re.sub("=.*$", "", variable) # strip '=' assignment
-                variable = re.sub("\([^\)]*\)", "", variable)  # strip '()' assignment
+                variable = _RE_ASSIGNMENT.sub("", variable) # strip '=' and '()' assignment
                 regex = "\<[^\>]*" + variable + "[^\<]*\>" # ignore it if it's in a template list
-                mm = re.search(regex, originalLine)
+                mm = "<" in originalLine and compileRegex(regex).search(originalLine)
                 if not mm:
                     variableList.append(variable.strip())
                 
@@ -1499,76 +2009,84 @@ def getVariableNames(line, stypes = getPrimitivesOr() + "|" + getUserTypeRegex()
 
 
 
+# used by getFunctionNames()
+# - regex 'or' of standard types ... and try to pick up user-defined ones with [A-Z]\w+
+# - several ways a function decl line could terminate: _FUNCTION_LINE_END
+_FUNCTION_LINE_END     = "\)\s*\{|\,|\)\s*\{\s*\};|"
+_RE_FUNCTION_DECLARATION = re.compile("\s*(?:inline\s+)?(?:" + _STYPES +
+                                      ")(?:\s+const)?(?:\s+[\&\*]\s*|\s*[\&\*]\s+|\s+)" +
+                                      "(\w[\w\d]*)\(.*(?:" + _FUNCTION_LINE_END + ")\s*$")
+
 ###################################################################
 # function getFunctionNames
 # - returns a list of function Names defined on the given line
 ###################################################################
 def getFunctionNames(line):
     
-    # regex 'or' of standard types ... and try to pick up user-defined ones with [A-Z]\w+
-    stypes = getPrimitivesOr() + "|[A-Z]\w+"
-
     functionNameList = []
 
-    # several ways a function decl line could terminate:
-    possLineEnd = "\)\s*\{|\,|\)\s*\{\s*\};|"
-    regex = ("^\s*(?:inline\s+)?(?:" + stypes +
-             ")(?:\s+const)?(?:\s+[\&\*]\s*|\s*[\&\*]\s+|\s+)(\w[\w\d]*)\(.*(?:" +
-             possLineEnd + ")\s*$")
-    m = re.search(regex, line)
+    # the name is followed by '(' ... most lines can be passed over without the regex
+    if "(" not in line:
+        return functionNameList
+
+    m = _RE_FUNCTION_DECLARATION.match(line)
     if m:
         functionNameList.append(m.group(1))
         
     return functionNameList
         
 
+# used by getTemplateNames()
+# - the keywords are removed wherever they are (even inside a name), along with any ',' before
+#   them, and the names are what's left between the spaces ... so it isn't a split on the commas
+_RE_TEMPLATE_LINE      = re.compile(r"\s*template<(.*?)>\s*$")
+_RE_TEMPLATE_TYPE      = re.compile(r",?\s*(typename|class|bool|float|double|int|unsigned int)")
+
 ###################################################################
 # function getTemplateNames
 # - returns a list of template names defined on the given line
 ###################################################################
 def getTemplateNames(line):
     templateNameList = []
-    m = re.search("^\s*template<(.*?)>\s*$", line)
+    m = line.lstrip().startswith("template<") and _RE_TEMPLATE_LINE.match(line)
     if m:
         templateString = m.group(1)
-        templateNames = re.sub(",?\s*(typename|class|bool|float|double|int|unsigned int)",
-                               "", templateString)
+        templateNames = _RE_TEMPLATE_TYPE.sub("", templateString)
         templateNameList += templateNames.split()
     return templateNameList
 
 
 
 ###################################################################
-# function getDefinitionLength
+# function setDefinitionLengths
 # - needed a way to distinguish between declaration (ending in ';')
 #   and a definition (with a block of code in {})
 # - either could be on multiple lines, so
 #   --> if we see a line ending in ';' before we see
 #       a line ending in '{' ... it's a declaration, otherwise, definition.
-# - if it's a definition ... return the number of lines
+# - if it's a definition ... store the number of lines in line.definitionLength
+# - one backward pass keeps the next ';'/'{' and the next '}' for every line,
+#   rather than searching forward from each line in turn
 ###################################################################
-def getDefinitionLength(lines, iLine):
-
-    isDefinition = None
-    jLine = iLine - 1
-    while (jLine < len(lines)):
-        if ( re.search(";\s*$", lines[jLine].stripped) ):
+def setDefinitionLengths(lines):
+
+    nLines = len(lines)
+    isDefinition = None   # whether the next ';' or '{' is a '{'
+    jClose = nLines       # index of the next line with a '}' (none found runs to the end)
+    searchEnd = _RE_DECLARATION_END.search
+    for iLine in range(nLines - 1, -1, -1):
+        line = lines[iLine]
+        stripped = line.stripped
+        if ( ";" in stripped and searchEnd(stripped) ):
             isDefinition = False
-            break
-        if ( re.search("\{", lines[jLine].stripped) ):
+        elif ( line.hasOpenBrace ):
             isDefinition = True
-            break
-        jLine += 1
-
-    # if it's a definition ... count the lines
-    definitionLength = -1
-    if ( isDefinition ):
-        jLine = iLine - 1
-        while (not re.search("\}", lines[jLine].stripped) ):
-            jLine += 1
-        definitionLength = jLine - iLine
-        
-    return definitionLength
+        if ( line.hasCloseBrace ):
+            jClose = iLine
+
+        # if it's a definition ... count the lines
+        if ( isDefinition ):
+            line.definitionLength = jClose - iLine - 1
 
 
 
@@ -1717,12 +2235,118 @@ def initializeTestList(filetype, infile):
     # 6-24 (don't mix block comments with code)               # --> tricky
     # 6-25 (align comment with block)                         # --> tricky
 
+
+    # keep only the tests which apply to this type of file,
+    # so apply() needn't check the filetype (and non-applicable tests are never run)
+    testList = [test for test in testList if test.filetype in test.typeList]
     
     return testList
 
 
 
 
+##########################################################################
+# Function checkFile()
+# - run the tests on one file
+# - 'contents' is what's in the file, if the caller has read it already
+# - returns the violations which weren't suppressed, sorted by line number,
+#   as (lineNumber, comment, rule, severity, raw, stripped) so they can be
+#   sent back from a worker process
+##########################################################################
+def checkFile(infile, contents = None):
+    
+    # the type is the suffix, if it's one we know (so 'x.cpp' isn't taken for a 'c' file)
+    filetype = infile.rpartition(".")[2]
+    if filetype not in _FILETYPES:
+        filetype = ""
+
+        
+    ##########################################################################
+    # build the list of tests
+    testList = initializeTestList(filetype, infile)
+    
+    ##########################################################################
+    # load the file and create the line info structures
+    # - if no test applies to this type of file, there's nothing to parse it for
+    # - it's read in one piece, which parseLines() needs as well as the lines
+    #   (StringIO splits the lines just as readlines() would, only at '\n')
+    if contents is None:
+        fp = open(infile, 'r')
+        contents = fp.read() if testList else ""
+        fp.close()
+    if not testList:
+        return []
+    lines = parseLines(cStringIO.StringIO(contents).readlines(), filetype, contents)
+
+    ##########################################################################
+    # run each test and accumulate violations
+    violationList = []
+    for test in testList:
+        if not test.isRuledOut(lines):
+            violationList += test.apply(lines)
+
+    ##########################################################################
+    # sort by line number, and skip the ones with a suppression line
+    # - there's one of these for every violation, so the attributes are read directly
+    violationFinal = []
+    violationList.sort(key = operator.attrgetter("lineNumber"))
+    for violation in violationList:
+        line, test = violation.line, violation.test
+        rule = test.id
+        if not (line.suppress and rule in line.suppress):
+            violationFinal.append( (violation.lineNumber, violation.getComment(), rule,
+                                    test.severity, line.raw, line.stripped) )
+    return violationFinal
+
+
+###################################################################
+# Function checkFileCached
+# - checkFile(), keeping the results in a cache directory (if one is given) so a file
+#   which hasn't changed isn't parsed and tested again on the next run
+# - the results depend only on the file's name (its type, and 4-2) and contents, and on this
+#   script, so they're kept under a hash of those
+# - takes an (infile, cacheDir) pair so it can be handed to Pool.map()
+###################################################################
+_scriptHash = [None]
+
+def checkFileCached(fileAndCacheDir):
+    infile, cacheDir = fileAndCacheDir
+    if not cacheDir:
+        return checkFile(infile)
+
+    if _scriptHash[0] is None:
+        fp = open(os.path.splitext(os.path.abspath(__file__))[0] + ".py", 'rb')
+        _scriptHash[0] = hashlib.sha1(fp.read()).hexdigest()
+        fp.close()
+
+    fp = open(infile, 'rb')
+    contents = fp.read()
+    fp.close()
+    key = hashlib.sha1("\0".join([_scriptHash[0], infile, contents])).hexdigest()
+    cacheFile = os.path.join(cacheDir, key)
+
+    if os.path.exists(cacheFile):
+        fp = open(cacheFile, 'rb')
+        violationFinal = pickle.load(fp)
+        fp.close()
+        return violationFinal
+
+    violationFinal = checkFile(infile, contents)    # it needn't be read again
+    
+    # write it under another name and move it into place, so another process never reads half of it
+    if not os.path.isdir(cacheDir):
+        try:
+            os.makedirs(cacheDir)
+        except OSError:
+            pass    # made by another process in the meantime
+    tmpFile = "%s.%d" % (cacheFile, os.getpid())
+    fp = open(tmpFile, 'wb')
+    pickle.dump(violationFinal, fp, pickle.HIGHEST_PROTOCOL)
+    fp.close()
+    os.rename(tmpFile, cacheFile)
+    return violationFinal
+
+    
 #############################################################
 #
 # Main body of code
@@ -1743,6 +2367,12 @@ def main():
                       default = False, help = "Show the stripped offending line (default = %default)")
     parser.add_option("-w", "--showraw", dest = "showraw", action = "store_true",
                       default = False, help = "Show the raw offending line (default = %default)")
+    parser.add_option("-j", "--jobs", dest = "jobs", type = int,
+                      default = 0, help = "Number of files to check at once " +
+                      "(default = %default, one per cpu)")
+    parser.add_option("-c", "--cache", dest = "cache", default = None,
+                      help = "Directory in which to keep the results for each file, " +
+                      "so unchanged files aren't checked again (default = %default)")
     parser.add_option("-s", "--severity", dest = "severity", type = int,
                       default = 5, help = "Minimum severity (highest numerical value) " +
                       "to display (default = %default)")
@@ -1751,81 +2381,91 @@ def main():
     if opts.showline:
         opts.showraw = True
 
-    if len(args) != 1:
+    if len(args) < 1:
         parser.print_help()
         sys.exit(1)
 
-    infile, = args
-    m = re.search(".*\.(cc|c|h|py)", infile)
-    if m:
-        filetype = m.group(1)
-    else:
-        filetype = ""
-
-        
-    ##########################################################################
-    # build the list of tests
-    testList = initializeTestList(filetype, infile)
-    
-    ##########################################################################
-    # load the file and create the line info structures
-    fp = open(infile, 'r')
-    lines = parseLines(fp.readlines(), filetype)
-    fp.close()
-
-    ##########################################################################
-    # run each test and accumulate violations
-    violationList = []
-    for test in testList:
-        violationList += test.apply(lines)
-
     ##########################################################################
     # load the .ignore file to deal with known (and accepted) violations
-    ignore = {}
+    # - each is kept as a (filename, rule, line) tuple, so a violation is looked up in one step
+    ignore = set()
     if (os.path.exists(opts.ignore)):
         fp = open(opts.ignore, 'r')
         for line in fp:
-            line = re.sub("#.*$", "", line)            # remove any '#' comments        
-            if (re.search("^\s*$", line)): continue    # skip blank lines
-
-            igFile, igRule, igLine = line.split()
-            if (ignore.has_key(igFile) and ignore[igFile].has_key[igRule]):
-                ignore[igFile][igRule].append(igLine)
-            elif (ignore.has_key(igFile) and not ignore[igFile].has_key[igRule]):
-                ignore[igFile][igRule] = [igLine]
-            else:
-                ignore[igFile] = { igRule: [igLine] }
+            fields = line.split("#", 1)[0].split()     # remove any '#' comments
+            if (not fields): continue                  # skip blank lines
+
+            igFile, igRule, igLine = fields
+            ignore.add( (igFile, igRule, igLine) )
         fp.close()
 
-    
     ##########################################################################
-    # print the results, sorted by line number
-    violationFinal = []
-    violationSort = sorted(violationList, key = lambda x: x.getLineNumber())
+    # check the files in parallel if there are several
+    # (each is parsed and tested on its own, so there's nothing for the workers to share)
+    # - starting the workers takes longer than checking a few files, so a few are checked here
+    # - the results come back in the order the files were given, and each file's are printed
+    #   as soon as they (and those before them) are ready
+    jobs = opts.jobs or multiprocessing.cpu_count()
+    filesAndCacheDir = [(infile, opts.cache) for infile in args]
+    pool = None
+    if len(args) >= 4 and jobs > 1:
+        jobs = min(jobs, len(args))
+        pool = multiprocessing.Pool(jobs)
+        chunkSize = max(1, len(args) // (4 * jobs))   # as Pool.map() would, but streamed
+        results = pool.imap(checkFileCached, filesAndCacheDir, chunkSize)
+    else:
+        results = (checkFileCached(fileAndCacheDir) for fileAndCacheDir in filesAndCacheDir)
 
-    # skip the ones with a suppression line
-    for violation in violationSort:
-        parasoftSuppress = "LsstDm-" + violation.getId() in violation.line.suppress
-        if not parasoftSuppress:
-            violationFinal.append(violation)
-            
-    if violationFinal:
-        print "// -*- parasoft -*-"
-        print infile
-    for violation in violationFinal:
-        lineNumber = str(violation.getLineNumber())
-        rule = violation.getId()
-        doIgnore = (ignore.has_key(infile) and ignore[infile].has_key(rule) and
-                    (lineNumber in ignore[infile][rule]))
+    ##########################################################################
+    # print the results, in the order the files were given
+    # - each file's output is collected and written at once, rather than a print per line
+    # - the lines are shown as 'print line,' would: a space goes before whatever follows a line
+    #   which didn't end in a newline (softSpace), and a newline after the last
+    write = sys.stdout.write
+    softSpace = False
+    for infile in args:
+        violationFinal = next(results)
+        out = []
         
-        severity = violation.getSeverity()
-        if ( not doIgnore  and (severity <= opts.severity) ):
-            print "%-4s \t%-60s \t%10s" % (lineNumber + ":", violation.getComment(),
-                                           "LsstDm-" + rule + "-" + str(severity))
-            if (opts.showraw):
-                print lines[int(lineNumber) - 1].raw,
-            if (opts.showstripped):
-                print lines[int(lineNumber) - 1].stripped,
+        if violationFinal:
+            if (softSpace):
+                out.append(" ")
+            out.append("// -*- parasoft -*-\n" + infile + "\n")
+            softSpace = False
+        # (the severity is checked first, as it's cheaper than looking the violation up)
+        for lineNumber, comment, rule, severity, raw, stripped in violationFinal:
+            if ( severity > opts.severity ):
+                continue
+            lineNumber = str(lineNumber)
+            doIgnore = ignore and (infile, rule, lineNumber) in ignore
+
+            if ( not doIgnore ):
+                if (softSpace):
+                    out.append(" ")
+                out.append("%-4s \t%-60s \t%10s\n" % (lineNumber + ":", comment,
+                                                      "LsstDm-" + rule + "-" + str(severity)))
+                softSpace = False
+
+                shown = []
+                if (opts.showraw):
+                    shown.append(raw)
+                if (opts.showstripped):
+                    shown.append(stripped)
+                for text in shown:
+                    if (softSpace):
+                        out.append(" ")
+                    out.append(text)
+                    softSpace = not (text[-1:].isspace() and text[-1:] != " ")
+
+        if out:
+            write("".join(out))
+
+    if softSpace:
+        write("\n")
+
+    if pool:
+        pool.close()
+        pool.join()
 
 
 #############################################################
@@ -35,11 +35,11 @@ def main():
             noI.main(fp, False, 'b')
             sys.stdout.close()
             sys.stdout = sout
-            print "Succeeded: ", errorMsgFile
-        except Exception,e:
+            print("Succeeded:  %s" % errorMsgFile)
+        except Exception as e:
             sys.stdout.close()
             sys.stdout = sout
-            print "Failed: ", errorMsgFile, e
+            print("Failed:  %s %s" % (errorMsgFile, e))
             pass
         fp.close()
 
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# Original filename: test-style-cache.py
+#
+# Summary:
+#
+# This program checks that style.py -c (the cache of each file's results)
+#  gives the same output as a fresh run: when the results come from the cache,
+#  and after the file, or style.py itself, has changed.
+# It takes no command line arguments or options.
+#
+# Usage: test-style-cache.py
+#
+"""
+%prog [options]
+"""
+
+import sys
+import optparse
+import os
+import shutil
+import subprocess
+import tempfile
+
+def red(s):   return "\033[31;1m " + s + " \033[0m"
+def green(s): return "\033[32;1m " + s + " \033[0m"
+
+#############################################################
+# run style.py (the copy given) on a file, with a cache directory if one is given
+#############################################################
+def runStyle(script, testFile, cacheDir = None):
+    cmd = [sys.executable, script]
+    if cacheDir:
+        cmd += ["-c", cacheDir]
+    proc = subprocess.Popen(cmd + [testFile], stdout = subprocess.PIPE, stderr = subprocess.STDOUT)
+    return proc.communicate()[0]
+
+#############################################################
+#
+# Main body of code
+#
+#############################################################
+
+def main():
+
+    ########################################################################
+    # command line arguments and options
+    ########################################################################
+
+    parser = optparse.OptionParser(usage = __doc__)
+    opts, args = parser.parse_args()
+
+    if len(args) > 0:
+        parser.print_help()
+        sys.exit(1)
+
+    lsstDir = os.getenv("LSST_DIR")
+    script = os.path.join(lsstDir, "scripts", "style.py")
+    fixture = os.path.join(lsstDir, "tests", "styleData", "test5-10.cc")
+
+    # work on copies, as the file and the script are both changed
+    workDir = tempfile.mkdtemp()
+    results = []   # (what's checked, passed?)
+    try:
+        cacheDir = os.path.join(workDir, "cache")
+        testFile = os.path.join(workDir, "test5-10.cc")
+        shutil.copy(fixture, testFile)
+        scriptCopy = os.path.join(workDir, "style.py")
+        shutil.copy(script, scriptCopy)
+
+        # the first run fills the cache, the second reads it
+        fresh = runStyle(scriptCopy, testFile)
+        first = runStyle(scriptCopy, testFile, cacheDir)
+        nCached = len(os.listdir(cacheDir))
+        second = runStyle(scriptCopy, testFile, cacheDir)
+        results.append(("cache miss", first == fresh and nCached == 1))
+        results.append(("cache hit", second == fresh and len(os.listdir(cacheDir)) == 1))
+
+        # a change to the file gets its own entry ... and its own results
+        fp = open(testFile, 'a')
+        fp.write("int " + "x"*120 + ";\n")    # a line over 110 characters (4-6)
+        fp.close()
+        fresh = runStyle(scriptCopy, testFile)
+        edited = runStyle(scriptCopy, testFile, cacheDir)
+        results.append(("file changed", edited == fresh and edited != second and
+                         len(os.listdir(cacheDir)) == 2))
+
+        # as does a change to the script
+        fp = open(scriptCopy, 'a')
+        fp.write("\n# changed\n")
+        fp.close()
+        changed = runStyle(scriptCopy, testFile, cacheDir)
+        results.append(("script changed", changed == fresh and len(os.listdir(cacheDir)) == 3))
+
+    finally:
+        shutil.rmtree(workDir)
+
+    #######################################################
+    # output
+    for name, passed in results:
+        print "%-24s " % (name),
+        if passed:
+            print green("Pass")
+        else:
+            print red("Fail")
+
+#############################################################
+# end
+#############################################################
+
+if __name__ == '__main__':
+    main()